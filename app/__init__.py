@@ -13,6 +13,9 @@ if not local_setup_py_path.exists():
 
 import app.local_setup
 
+# reuse database connections in all processes
+import app.connection_pool
+
 # configure application and packages
 import app.pipelines
 import app.data_sets
@@ -26,3 +29,13 @@ import olist_ecommerce
 def MARA_CONFIG_MODULES():
     from . import config
     return [config]
+
+
+def MARA_AUTOMIGRATE_SQLALCHEMY_MODELS():
+    from . import startup_benchmark
+    return [startup_benchmark.StartupBenchmarkRun, startup_benchmark.StartupBenchmarkImport]
+
+
+def MARA_CLICK_COMMANDS():
+    from . import startup_benchmark
+    return [startup_benchmark.benchmark_startup]
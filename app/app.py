@@ -1,9 +1,11 @@
 from mara_app.app import MaraApp
 
+from app.ui.instrumentation import InstrumentationMiddleware
+
 
 app = MaraApp()
 
-# from werkzeug.contrib.profiler import ProfilerMiddleware
-# app.wsgi_app = ProfilerMiddleware(app.wsgi_app, profile_dir='/tmp/')
+# latency by route & sampling of slow requests, see app.config.instrumentation_enabled
+app.wsgi_app = InstrumentationMiddleware(app.wsgi_app)
 
 wsgi_app = app.wsgi_app
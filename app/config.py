@@ -11,4 +11,79 @@ def data_dir():
 
 def first_date():
     """The first date for which to process data (can be used to limit data volumes on local machine)"""
-    return datetime.date(2017, 1, 1)
\ No newline at end of file
+    return datetime.date(2017, 1, 1)
+
+
+def last_date():
+    """The last date for which to process data (together with `first_date` a window of days to process)"""
+    return datetime.date(3000, 1, 1)
+
+
+def data_explorer_cache_size():
+    """The maximum size in bytes of cached data explorer results in each web server process"""
+    return 100 * 1024 * 1024
+
+
+def data_explorer_cache_check_interval():
+    """After how many seconds to check again whether the data_sets schema was replaced (invalidating the cache)"""
+    return 10
+
+
+def connection_pool_min_size():
+    """How many connections to a database are opened when a process first uses it"""
+    return 1
+
+
+def connection_pool_max_size():
+    """The maximum number of open connections to a database per process (at least the number of web server threads)"""
+    return 10
+
+
+def connection_pool_health_check_interval():
+    """After how many idle seconds a pooled connection is checked with a query before it is reused"""
+    return 30
+
+
+def acl_permission_cache_ttl():
+    """For how many seconds permissions of users are cached in each web server process"""
+    return 60
+
+
+def graph_cache_dir():
+    """The directory where the rendered diagrams of the start page are cached (shared by all web server processes)"""
+    return pathlib.Path('./.graph-cache')
+
+
+def instrumentation_enabled():
+    """Whether the latency and database time of web requests is recorded (see `app.ui.instrumentation`)"""
+    return True
+
+
+def instrumentation_sample_size():
+    """From how many of the last requests of a route the latency percentiles are computed"""
+    return 1000
+
+
+def request_sampling_enabled():
+    """Whether the stacks of requests are sampled, for dumping flame graphs of slow requests"""
+    return False
+
+
+def request_sampling_interval():
+    """The seconds between two samples of the stacks of running requests"""
+    return 0.01
+
+
+def slow_request_threshold():
+    """After how many seconds a request is considered slow and its sampled stacks are written to a file"""
+    return 2.0
+
+
+def request_profile_dir():
+    """The directory where the sampled stacks of slow requests are written to"""
+    return pathlib.Path('./.request-profiles')
+
+
+def number_of_request_profiles():
+    """How many of the newest profiles of slow requests are kept"""
+    return 100
@@ -0,0 +1,170 @@
+"""Pooled connections to all PostgreSQL databases, used by `mara_db.postgresql.postgres_cursor_context`"""
+
+import contextlib
+import os
+import threading
+import time
+import typing
+
+import mara_db.dbs
+import mara_db.postgresql
+from mara_app.monkey_patch import wrap
+
+import app.config
+
+
+class ConnectionPool():
+    def __init__(self, db: mara_db.dbs.PostgreSQLDB) -> None:
+        """
+        Open connections to a database that are reused by all threads of a process. At most
+        `app.config.connection_pool_max_size` connections are open at the same time, threads that need
+        another connection wait until one is returned to the pool.
+        """
+        self.db = db
+        self.idle_connections: [('psycopg2.extensions.connection', float)] = []
+        self.slots = threading.BoundedSemaphore(app.config.connection_pool_max_size())
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.opened = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.discarded = 0
+
+        for _ in range(app.config.connection_pool_min_size()):
+            self.idle_connections.append((self.connect(), time.time()))
+
+    def connect(self) -> 'psycopg2.extensions.connection':
+        import psycopg2
+
+        connection = psycopg2.connect(dbname=self.db.database, user=self.db.user, password=self.db.password,
+                                      host=self.db.host, port=self.db.port)  # type: psycopg2.extensions.connection
+        with self.lock:
+            self.opened += 1
+        return connection
+
+    def is_healthy(self, connection: 'psycopg2.extensions.connection', idle_since: float) -> bool:
+        """Connections that were idle for a while are checked with a query, as the server might have closed them"""
+        import psycopg2
+        import psycopg2.extensions
+
+        if connection.closed or connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.time() - idle_since < app.config.connection_pool_health_check_interval():
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def get(self) -> 'psycopg2.extensions.connection':
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.waits += 1
+            self.slots.acquire()
+
+        try:
+            while True:
+                with self.lock:
+                    connection, idle_since = self.idle_connections.pop() if self.idle_connections else (None, None)
+                if not connection:
+                    connection = self.connect()
+                    break
+                if self.is_healthy(connection, idle_since):
+                    break
+                self.close(connection)
+        except Exception:
+            self.slots.release()
+            raise
+
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+        return connection
+
+    def put(self, connection: 'psycopg2.extensions.connection', discard: bool = False):
+        """Returns a connection to the pool, or closes it when it is broken"""
+        with self.lock:
+            self.in_use -= 1
+            if not discard and not connection.closed:
+                self.idle_connections.append((connection, time.time()))
+        if discard or connection.closed:
+            self.close(connection)
+        self.slots.release()
+
+    def close(self, connection: 'psycopg2.extensions.connection'):
+        with self.lock:
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools: {(str, int): ConnectionPool} = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(db_alias: str) -> ConnectionPool:
+    """
+    The pool of a database alias in the current process.
+    The process id is part of the key because connections can not be shared with forked task processes.
+    """
+    with _pools_lock:
+        if (db_alias, os.getpid()) not in _pools:
+            db = mara_db.dbs.db(db_alias)
+            assert (isinstance(db, mara_db.dbs.PostgreSQLDB))
+            _pools[(db_alias, os.getpid())] = ConnectionPool(db)
+        return _pools[(db_alias, os.getpid())]
+
+
+def connection_pools() -> {str: ConnectionPool}:
+    """The pools of the current process by database alias"""
+    with _pools_lock:
+        return {db_alias: pool for (db_alias, pid), pool in _pools.items() if pid == os.getpid()}
+
+
+@contextlib.contextmanager
+def connection_context(db_alias: str) -> 'psycopg2.extensions.connection':
+    """
+    Borrows a connection from the pool of a database alias, e.g. in the function of a `RunFunction` task.
+    Open transactions are rolled back when the connection is returned.
+    """
+    import psycopg2
+
+    pool = connection_pool(db_alias)
+    connection = pool.get()
+    discard = False
+    try:
+        yield connection
+    finally:
+        if not connection.closed:
+            try:
+                connection.rollback()
+                connection.autocommit = False
+            except psycopg2.Error:
+                discard = True
+        pool.put(connection, discard=discard)
+
+
+@contextlib.contextmanager
+def pooled_cursor_context(db_alias: str) -> 'psycopg2.extensions.cursor':
+    """Creates a context with a psycopg2 cursor on a pooled connection of a database alias"""
+    with connection_context(db_alias) as connection:  # type: psycopg2.extensions.connection
+        cursor = connection.cursor()  # type: psycopg2.extensions.cursor
+        try:
+            yield cursor
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+
+@wrap(mara_db.postgresql.postgres_cursor_context)
+def postgres_cursor_context(original_function, db: typing.Union[str, mara_db.dbs.PostgreSQLDB]):
+    """Uses pooled connections for database aliases (but not for database objects, which are not shared)"""
+    return pooled_cursor_context(db) if isinstance(db, str) else original_function(db)
@@ -9,9 +9,13 @@ from mara_pipelines.pipelines import Pipeline
 from mara_app.monkey_patch import patch
 
 import app.config
+import app.pipelines.scheduling  # activates critical path aware prioritization of tasks
+import app.pipelines.sql_telemetry  # activates the recording of sql telemetry (when configured)
+from app.pipelines.dependencies import add_cross_pipeline_dependency
 
 patch(mara_pipelines.config.data_dir)(lambda: app.config.data_dir())
 patch(mara_pipelines.config.first_date)(lambda: app.config.first_date())
+patch(mara_pipelines.config.last_date)(lambda: app.config.last_date())
 patch(mara_pipelines.config.default_db_alias)(lambda: 'dwh')
 
 
@@ -35,16 +39,34 @@ def root_pipeline():
     pipeline.add(app.pipelines.load_data.load_ecommerce_data.pipeline)
     pipeline.add(app.pipelines.load_data.load_marketing_data.pipeline)
     pipeline.add(app.pipelines.e_commerce.pipeline, upstreams=['load_ecommerce_data'])
-    pipeline.add(app.pipelines.marketing.pipeline,
-                 upstreams=['load_marketing_data', 'e_commerce'])
+    pipeline.add(app.pipelines.marketing.pipeline, upstreams=['load_marketing_data'])
 
-    pipeline.add(app.pipelines.generate_artifacts.pipeline, upstreams=['marketing'])
+    # the lead dimension only needs the seller dimension, not the whole e-commerce pipeline
+    add_cross_pipeline_dependency(app.pipelines.e_commerce.pipeline.nodes['transform_seller'],
+                                  app.pipelines.marketing.pipeline.nodes['transform_lead'])
+
+    pipeline.add(app.pipelines.generate_artifacts.pipeline, upstreams=['e_commerce', 'marketing'])
     pipeline.add(app.pipelines.update_frontends.pipeline, upstreams=['generate_artifacts'])
     pipeline.add(app.pipelines.consistency_checks.pipeline, upstreams=['generate_artifacts'])
 
     return pipeline
 
 
+def MARA_AUTOMIGRATE_SQLALCHEMY_MODELS():
+    from . import benchmark, build_cache, date_window, sql_telemetry
+    return [build_cache.BuildCacheEntry, benchmark.BenchmarkRun, benchmark.BenchmarkTaskResult,
+            date_window.LoadedDateWindow,
+            sql_telemetry.SqlTelemetryCommand, sql_telemetry.SqlTelemetryStatement, sql_telemetry.SqlTelemetryTableSize]
+
+
+def MARA_CLICK_COMMANDS():
+    from . import cli
+    from .generate_artifacts import cli as generate_artifacts_cli
+    from .load_data import cli as load_data_cli, synthetic_data
+    return [cli.run, cli.benchmark, cli.check_customer_consolidation, load_data_cli.benchmark_copy,
+            synthetic_data.generate_synthetic_data, generate_artifacts_cli.benchmark_storage_formats]
+
+
 patch(etl_tools.config.number_of_chunks)(lambda: 11)
 patch(etl_tools.config.first_date_in_time_dimensions)(lambda: app.config.first_date())
 patch(etl_tools.config.last_date_in_time_dimensions)(
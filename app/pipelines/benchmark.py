@@ -0,0 +1,196 @@
+"""Benchmark runs of pipelines with per-task timing & database statistics and detection of regressions"""
+
+import datetime
+import functools
+import statistics
+import time
+
+import mara_db.postgresql
+import mara_pipelines.config
+import sqlalchemy
+from mara_pipelines import pipelines
+from sqlalchemy.ext.declarative import declarative_base
+
+from app.pipelines import config
+
+Base = declarative_base()
+
+
+class BenchmarkRun(Base):
+    """A run of a pipeline (or a part of it) for benchmarking purposes"""
+    __tablename__ = 'data_integration_benchmark_run'
+
+    run_id = sqlalchemy.Column(sqlalchemy.INTEGER, primary_key=True, autoincrement=True)
+    node_path = sqlalchemy.Column(sqlalchemy.ARRAY(sqlalchemy.TEXT), nullable=False, index=True)
+    label = sqlalchemy.Column(sqlalchemy.TEXT)
+    dataset = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
+    serial = sqlalchemy.Column(sqlalchemy.BOOLEAN, nullable=False)
+    start_time = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True), nullable=False)
+    end_time = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True))
+    succeeded = sqlalchemy.Column(sqlalchemy.BOOLEAN)
+
+
+class BenchmarkTaskResult(Base):
+    """Timing and database statistics of a task in a benchmark run"""
+    __tablename__ = 'data_integration_benchmark_task_result'
+
+    run_id = sqlalchemy.Column(sqlalchemy.INTEGER, sqlalchemy.ForeignKey(BenchmarkRun.run_id, ondelete='CASCADE'),
+                               primary_key=True)
+    node_path = sqlalchemy.Column(sqlalchemy.ARRAY(sqlalchemy.TEXT), primary_key=True)
+    duration = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+    rows_written = sqlalchemy.Column(sqlalchemy.BIGINT)
+    blocks_read = sqlalchemy.Column(sqlalchemy.BIGINT)
+    blocks_hit = sqlalchemy.Column(sqlalchemy.BIGINT)
+    temp_bytes = sqlalchemy.Column(sqlalchemy.BIGINT)
+    wal_bytes = sqlalchemy.Column(sqlalchemy.BIGINT)
+    succeeded = sqlalchemy.Column(sqlalchemy.BOOLEAN, nullable=False)
+
+
+def dataset() -> str:
+    """A description of the data that pipelines currently run on (results are only compared for the same dataset)"""
+    return f'{config.ecommerce_source_schema()},{config.marketing_source_schema()}'
+
+
+def database_statistics() -> [int]:
+    """
+    Cumulated rows written, blocks read, blocks hit and temp bytes of the data warehouse database
+    and the position in the write-ahead log of its cluster
+    """
+    with mara_db.postgresql.postgres_cursor_context(mara_pipelines.config.default_db_alias()) as cursor:
+        cursor.execute('''
+SELECT pg_stat_clear_snapshot();
+SELECT tup_inserted + tup_updated + tup_deleted, blks_read, blks_hit, temp_bytes,
+       pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::BIGINT
+FROM pg_stat_database
+WHERE datname = current_database()''')
+        return list(cursor.fetchone())
+
+
+def measure_tasks(run_id: int):
+    """Wraps the `run` method of all tasks so that their duration & database statistics are stored for a run"""
+    original_run = pipelines.Task.run
+
+    @functools.wraps(original_run)
+    def run(task: pipelines.Task) -> bool:
+        statistics_before = database_statistics()
+        start_time = time.time()
+        succeeded = original_run(task)
+        duration = time.time() - start_time
+        # the statistics collector receives the counters of a session with a small delay
+        time.sleep(0.5)
+        rows_written, blocks_read, blocks_hit, temp_bytes, wal_bytes = [
+            after - before for before, after in zip(statistics_before, database_statistics())]
+
+        with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+            cursor.execute('''
+INSERT INTO data_integration_benchmark_task_result
+  (run_id, node_path, duration, rows_written, blocks_read, blocks_hit, temp_bytes, wal_bytes, succeeded)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''', (run_id, task.path(), duration, rows_written, blocks_read,
+                                                blocks_hit, temp_bytes, wal_bytes, succeeded))
+        return succeeded
+
+    pipelines.Task.run = run
+
+
+def start_run(node_path: [str], label: str, serial: bool) -> int:
+    """Stores a new benchmark run and returns its id"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+INSERT INTO data_integration_benchmark_run (node_path, label, dataset, serial, start_time)
+VALUES (%s, %s, %s, %s, %s)
+RETURNING run_id''', (node_path, label, dataset(), serial, datetime.datetime.now(datetime.timezone.utc)))
+        return cursor.fetchone()[0]
+
+
+def finish_run(run_id: int, succeeded: bool):
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+UPDATE data_integration_benchmark_run
+SET end_time = %s, succeeded = %s
+WHERE run_id = %s''', (datetime.datetime.now(datetime.timezone.utc), succeeded, run_id))
+
+
+def run_benchmark(pipeline: pipelines.Pipeline, nodes: {pipelines.Node} = None, with_upstreams: bool = False,
+                  label: str = None, serial: bool = False) -> int:
+    """
+    Runs a pipeline (or parts of it) and records the duration and database statistics of each task
+
+    Args:
+        pipeline: The pipeline to run
+        nodes: A list of pipeline children that should run
+        with_upstreams: When true and `nodes` are provided, then all upstreams of `nodes` in `pipeline` are also run
+        label: A free text description of the benchmarked state, e.g. a git commit
+        serial: When true, tasks are run one after another. Gives exact database statistics per task, as the
+                database counters can otherwise not be attributed to concurrently running tasks.
+
+    Returns:
+        The id of the benchmark run
+    """
+    import mara_pipelines.ui.cli
+    from mara_app.monkey_patch import patch
+
+    if serial:
+        patch(mara_pipelines.config.max_number_of_parallel_tasks)(lambda: 1)
+
+    run_id = start_run(pipeline.path(), label, serial)
+    measure_tasks(run_id)
+    succeeded = mara_pipelines.ui.cli.run_pipeline(pipeline, nodes, with_upstreams, interactively_started=False)
+    finish_run(run_id, succeeded)
+    return run_id
+
+
+def task_results(run_id: int) -> [dict]:
+    """
+    Returns the task results of a benchmark run together with a baseline duration, which is the median
+    duration of the same task in the last `config.benchmark_baseline_runs()` earlier successful runs on
+    the same dataset.
+    """
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+WITH run AS (SELECT * FROM data_integration_benchmark_run WHERE run_id = %(run_id)s),
+     earlier_result AS (
+         SELECT result.node_path, result.duration,
+                row_number() OVER (PARTITION BY result.node_path ORDER BY result.run_id DESC) AS number
+         FROM data_integration_benchmark_task_result result
+                  JOIN data_integration_benchmark_run earlier_run USING (run_id)
+                  JOIN run ON earlier_run.dataset = run.dataset AND earlier_run.serial = run.serial
+         WHERE earlier_run.run_id < run.run_id AND result.succeeded)
+
+SELECT result.node_path, result.duration, result.rows_written, result.blocks_read, result.blocks_hit,
+       result.temp_bytes, result.wal_bytes, result.succeeded,
+       (SELECT array_agg(duration) FROM earlier_result
+        WHERE earlier_result.node_path = result.node_path AND number <= %(baseline_runs)s)
+FROM data_integration_benchmark_task_result result
+WHERE run_id = %(run_id)s
+ORDER BY result.duration DESC''', {'run_id': run_id, 'baseline_runs': config.benchmark_baseline_runs()})
+
+        results = []
+        for node_path, duration, rows_written, blocks_read, blocks_hit, temp_bytes, wal_bytes, succeeded, \
+            earlier_durations in cursor.fetchall():
+            baseline = statistics.median(earlier_durations) if earlier_durations else None
+            results.append({'node_path': node_path, 'duration': duration, 'rows_written': rows_written,
+                            'blocks_read': blocks_read, 'blocks_hit': blocks_hit, 'temp_bytes': temp_bytes,
+                            'wal_bytes': wal_bytes,
+                            'succeeded': succeeded, 'baseline': baseline,
+                            'is_regression': is_regression(duration, baseline)})
+        return results
+
+
+def is_regression(duration: float, baseline: float) -> bool:
+    """Whether a task is significantly slower than its baseline"""
+    return bool(baseline) and duration > baseline * (1 + config.benchmark_regression_threshold() / 100) \
+           and duration - baseline > config.benchmark_minimum_regression_seconds()
+
+
+def runs(run_id: int = None, limit: int = 50) -> [BenchmarkRun]:
+    """The last benchmark runs (or a specific one)"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute(f'''
+SELECT run_id, node_path, label, dataset, serial, start_time, end_time, succeeded
+FROM data_integration_benchmark_run
+{'WHERE run_id = %(run_id)s' if run_id is not None else ''}
+ORDER BY run_id DESC
+LIMIT %(limit)s''', {'run_id': run_id, 'limit': limit})
+        return [BenchmarkRun(run_id=run_id, node_path=path, label=label, dataset=dataset_, serial=serial,
+                             start_time=start_time, end_time=end_time, succeeded=succeeded)
+                for run_id, path, label, dataset_, serial, start_time, end_time, succeeded in cursor.fetchall()]
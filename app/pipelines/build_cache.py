@@ -0,0 +1,138 @@
+"""Skipping of sql tasks whose sql and input tables did not change since their last successful run"""
+
+import datetime
+import hashlib
+
+import mara_db.postgresql
+import sqlalchemy
+from mara_pipelines import config
+from mara_pipelines.commands.sql import _expand_pattern_substitution
+from mara_pipelines.logging import logger
+from mara_page import _
+from sqlalchemy.ext.declarative import declarative_base
+
+import app.pipelines.config
+from app.pipelines.session_settings import TunedExecuteSQL
+
+Base = declarative_base()
+
+
+class BuildCacheEntry(Base):
+    """The cache key and the resulting output tables of the last successful run of a command"""
+    __tablename__ = 'data_integration_build_cache'
+
+    node_path = sqlalchemy.Column(sqlalchemy.ARRAY(sqlalchemy.TEXT), primary_key=True)
+    cache_key = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
+    output_fingerprint = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
+    timestamp = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True))
+
+
+def table_fingerprints(db_alias: str, tables: [str]) -> str:
+    """
+    Computes a cheap fingerprint of the content of tables: the oid and file node of each table (they change with
+    DROP, TRUNCATE, CLUSTER etc.), the row count and the highest transaction id that wrote a row. Every insert or
+    update (including upserts) writes rows with a new transaction id and every delete changes the row count.
+    This reads the tables, but without converting rows to text.
+    With `app.pipelines.config.build_cache_row_hashes`, also the sum of the row hashes.
+
+    Returns: a fingerprint string or None when one of the tables does not exist
+    """
+    fingerprints = []
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        for table in tables:
+            cursor.execute('SELECT oid, relfilenode FROM pg_class WHERE oid = to_regclass(%s)', (table,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            row_hash = ' || \':\' || coalesce(sum(hashtext(t::TEXT)::BIGINT), 0)' \
+                if app.pipelines.config.build_cache_row_hashes() else ''
+            cursor.execute(f'''
+SELECT count(*) || ':' || coalesce(max(t.xmin::TEXT::BIGINT), 0){row_hash}
+FROM {table} t''')
+            fingerprints.append(f'{table}={row[0]}:{row[1]}:{cursor.fetchone()[0]}')
+    return ' '.join(fingerprints)
+
+
+def get_entry(node_path: [str]) -> (str, str):
+    """Returns the cache key and output fingerprint of the last successful run of a node (or None)"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+SELECT cache_key, output_fingerprint
+FROM data_integration_build_cache
+WHERE node_path = %s''', (node_path,))
+        return cursor.fetchone()
+
+
+def update(node_path: [str], cache_key: str, output_fingerprint: str):
+    """Stores the cache key and output fingerprint of a successful run of a node"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+INSERT INTO data_integration_build_cache (node_path, cache_key, output_fingerprint, timestamp)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (node_path)
+DO UPDATE SET cache_key = EXCLUDED.cache_key, output_fingerprint = EXCLUDED.output_fingerprint,
+              timestamp = EXCLUDED.timestamp''',
+                       (node_path, cache_key, output_fingerprint, datetime.datetime.utcnow()))
+
+
+def delete(node_path: [str]):
+    """Removes the cache entry of a node, forcing the next run to recompute"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('DELETE FROM data_integration_build_cache WHERE node_path = %s', (node_path,))
+
+
+class CachedExecuteSQL(TunedExecuteSQL):
+    def __init__(self, sql_file_name: str, input_tables: [str], output_tables: [str],
+                 depends_on_current_date: bool = False, replace: {str: str} = None, db_alias: str = None,
+                 echo_queries: bool = True, timezone: str = None, session_settings: {str: str} = None) -> None:
+        """
+        Runs an sql file only when the file or the content of its input tables changed since the last
+        successful run, or when its output tables were modified or removed in the meantime.
+
+        The output tables need to persist between runs (i.e. they must not live in a schema that is recreated
+        at the beginning of each run).
+
+        Args:
+            sql_file_name: The name of the file to run (relative to the directory of the parent pipeline)
+            input_tables: All tables that the file reads from
+            output_tables: All tables that the file creates
+            depends_on_current_date: Whether the result changes from day to day (e.g. because of `now()`)
+            session_settings: Database session settings for running the file (see `TunedExecuteSQL`)
+        """
+        super().__init__(sql_file_name=sql_file_name, replace=replace, db_alias=db_alias,
+                         echo_queries=echo_queries, timezone=timezone, session_settings=session_settings)
+        self.input_tables = input_tables
+        self.output_tables = output_tables
+        self.depends_on_current_date = depends_on_current_date
+
+    def cache_key(self) -> str:
+        """A combination of the hash of the sql, the relevant dates and the fingerprints of the input tables"""
+        sql_hash = hashlib.md5((self.sql_file_path().read_text()
+                                + repr(sorted(_expand_pattern_substitution(self.replace).items()))).encode())
+        return ' '.join([sql_hash.hexdigest(), str(config.first_date()), str(config.last_date()),
+                         str(datetime.date.today()) if self.depends_on_current_date else '',
+                         table_fingerprints(self.db_alias, self.input_tables) or ''])
+
+    def run(self) -> bool:
+        logger.log('compute cache key', format=logger.Format.ITALICS)
+        cache_key = self.cache_key()
+        entry = get_entry(self.node_path())
+        if entry and entry[0] == cache_key \
+                and entry[1] == table_fingerprints(self.db_alias, self.output_tables):
+            logger.log(f'{self.sql_file_name}: no changes in sql and input tables, skipping')
+            return True
+
+        # remove the entry first so that a failed run is never considered as cached
+        delete(self.node_path())
+
+        if not super().run():
+            return False
+
+        update(self.node_path(), cache_key, table_fingerprints(self.db_alias, self.output_tables) or '')
+        return True
+
+    def html_doc_items(self):
+        return super().html_doc_items() \
+               + [('input tables', _.tt[', '.join(self.input_tables)]),
+                  ('output tables', _.tt[', '.join(self.output_tables)]),
+                  ('depends on current date', _.tt[str(self.depends_on_current_date)])]
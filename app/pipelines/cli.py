@@ -0,0 +1,113 @@
+"""Project specific command line interface for running data pipelines"""
+
+import pathlib
+import sys
+
+import click
+import mara_db.postgresql
+import mara_pipelines.ui.cli
+from mara_app.monkey_patch import patch
+
+import app.config
+import app.pipelines.config
+
+
+@click.command()
+@click.option('--path', default='',
+              help='The id of of the pipeline to run. Example: "pipeline-id"; "" (default) is the root pipeline.')
+@click.option('--nodes',
+              help='IDs of sub-nodes of the pipeline to run, separated by comma. When provided, then only these nodes are run. Example: "do-this,do-that".')
+@click.option('--with_upstreams', default=False, is_flag=True,
+              help='Also run all upstreams of --nodes within the pipeline.')
+@click.option('--disable-colors', default=False, is_flag=True,
+              help='Output logs without coloring them.')
+@click.option('--full-refresh', default=False, is_flag=True,
+              help='Reload incrementally loaded tables from scratch instead of only copying new or changed rows.')
+@click.option('--first-date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Only process orders and leads from this day on. Example: "2018-01-01".')
+@click.option('--last-date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Only process orders and leads until this day. Example: "2018-01-07".')
+@click.pass_context
+def run(ctx: click.Context, path, nodes, with_upstreams, disable_colors: bool = False, full_refresh: bool = False,
+        first_date=None, last_date=None):
+    """
+    Runs a pipeline or a sub-set of its nodes, optionally with a full refresh of incrementally loaded data
+    or on a window of days
+    """
+    if first_date:
+        patch(app.config.first_date)(lambda: first_date.date())
+    if last_date:
+        patch(app.config.last_date)(lambda: last_date.date())
+
+    # a changed window of days also causes a full refresh (see `app.pipelines.date_window.date_window_changed`)
+    if full_refresh:
+        patch(app.pipelines.config.full_refresh)(lambda: True)
+
+    ctx.invoke(mara_pipelines.ui.cli.run, path=path, nodes=nodes,
+               with_upstreams=with_upstreams, disable_colors=disable_colors)
+
+
+@click.command()
+@click.option('--path', default='',
+              help='The id of of the pipeline to benchmark. Example: "pipeline-id"; "" (default) is the root pipeline.')
+@click.option('--nodes',
+              help='IDs of sub-nodes of the pipeline to run, separated by comma. When provided, then only these nodes are run. Example: "do-this,do-that".')
+@click.option('--with_upstreams', default=False, is_flag=True,
+              help='Also run all upstreams of --nodes within the pipeline.')
+@click.option('--label', help='A description of the benchmarked code, e.g. a git commit.')
+@click.option('--serial', default=False, is_flag=True,
+              help='Run one task at a time for an exact attribution of database statistics to tasks.')
+@click.option('--fail-on-regression', default=False, is_flag=True,
+              help='Exit with an error when a task is significantly slower than its baseline.')
+def benchmark(path, nodes, with_upstreams, label: str = None, serial: bool = False, fail_on_regression: bool = False):
+    """Runs a pipeline or a sub-set of its nodes and records & compares the performance of each task"""
+    from mara_pipelines import pipelines
+    import app.pipelines.benchmark
+
+    # benchmark runs also check that optimized queries give the same results as the former ones
+    patch(app.pipelines.config.expensive_consistency_checks)(lambda: True)
+
+    pipeline, found = pipelines.find_node(path.split(','))
+    if not found or not isinstance(pipeline, pipelines.Pipeline):
+        print(f'Pipeline {path} not found', file=sys.stderr)
+        sys.exit(-1)
+
+    _nodes = set()
+    for id in (nodes.split(',') if nodes else []):
+        node = pipeline.nodes.get(id)
+        if not node:
+            print(f'Node "{id}" not found in pipeline {path}', file=sys.stderr)
+            sys.exit(-1)
+        _nodes.add(node)
+
+    run_id = app.pipelines.benchmark.run_benchmark(pipeline, _nodes, with_upstreams, label=label, serial=serial)
+
+    print(f'\nBenchmark run {run_id}:')
+    regressions = []
+    for result in app.pipelines.benchmark.task_results(run_id):
+        baseline = f"{result['baseline']:8.1f}s" if result['baseline'] else ' ' * 9
+        print(f"{'/'.join(result['node_path']):<70} {result['duration']:8.1f}s {baseline} "
+              f"{'REGRESSION' if result['is_regression'] else ''}")
+        if result['is_regression']:
+            regressions.append(result)
+
+    if regressions and fail_on_regression:
+        sys.exit(-1)
+
+
+@click.command()
+@click.option('--db-alias', default='dwh', help='The database with the e-commerce data. Default: "dwh".')
+def check_customer_consolidation(db_alias: str):
+    """
+    Compares ec_tmp.customer (as built by the e_commerce pipeline) with the result of the former customer
+    consolidation query, see app/pipelines/e_commerce/check_customer_consolidation.sql
+    """
+    from app.pipelines.date_window import date_window_replacements
+
+    sql = (pathlib.Path(__file__).parent / 'e_commerce' / 'check_customer_consolidation.sql').read_text()
+    for placeholder, value in date_window_replacements.items():
+        sql = sql.replace(placeholder, str(value()))
+
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:
+        cursor.execute(sql)
+    print('The customer consolidation gives the same result as the former query')
@@ -15,3 +15,113 @@ def number_of_chunks() -> int:
 def first_date() -> datetime.date:
     """Ignore data before this date"""
     return datetime.date(2016, 1, 1)
+
+
+def full_refresh() -> bool:
+    """When True, incrementally loaded tables are dropped and loaded from scratch instead of being upserted into"""
+    return False
+
+
+def deferred_constraint_validation() -> bool:
+    """
+    When True, foreign keys are added as `NOT VALID` and validated afterwards in a separate transaction per table.
+    This avoids that the constrain tasks of different tables block each other on the tables they reference.
+    """
+    return True
+
+
+def unlogged_staging_tables() -> bool:
+    """
+    When True, the tables in the tmp schemas are created `UNLOGGED`: they are not written to the write-ahead log
+    and not replicated, and they are emptied after a database crash (which the build cache detects)
+    """
+    return True
+
+
+def memory_intensive_session_settings() -> {str: str}:
+    """Database session settings for tasks with large sorts and window functions"""
+    return {'work_mem': '256MB', 'max_parallel_workers_per_gather': '4'}
+
+
+def ecommerce_source_schema() -> str:
+    """The schema in the olist database to load e-commerce data from (e.g. a scaled copy like `ecommerce_x100`)"""
+    return 'ecommerce'
+
+
+def marketing_source_schema() -> str:
+    """The schema in the olist database to load marketing data from (e.g. a scaled copy like `marketing_x100`)"""
+    return 'marketing'
+
+
+def expensive_consistency_checks() -> bool:
+    """
+    When True, the consistency checks also compare the results of optimized queries with those of the queries
+    they replaced (which is as expensive as before the optimization). For CI, always on in benchmark runs.
+    """
+    return False
+
+
+def benchmark_regression_threshold() -> float:
+    """By how many percent a task in a benchmark run needs to be slower than its baseline to be flagged"""
+    return 20
+
+
+def benchmark_minimum_regression_seconds() -> float:
+    """Tasks that are slower than their baseline by less than this are never flagged (avoids noise in short tasks)"""
+    return 5
+
+
+def benchmark_baseline_runs() -> int:
+    """The baseline of a task is the median duration in this many earlier benchmark runs"""
+    return 5
+
+
+def critical_path_scheduling() -> bool:
+    """When True, tasks on the longest chain of dependencies (by recent durations) are started first"""
+    return True
+
+
+def scheduling_history_runs() -> int:
+    """How many recent runs of a node are used for estimating its duration when scheduling"""
+    return 10
+
+
+def data_set_storage_format(frontend: str, data_set_id: str) -> str:
+    """
+    How the table of a data set is stored for a front-end ('metabase', 'data_explorer' or 'mondrian'), one of
+    'heap', 'heap_brin', 'cstore_pglz', 'cstore_none' or 'partitioned_heap'.
+    Use `flask app.pipelines.generate_artifacts.benchmark-storage-formats` for comparing them.
+    """
+    return 'heap' if frontend == 'mondrian' else 'cstore_pglz'
+
+
+def sql_telemetry() -> bool:
+    """
+    When True, the plans, buffer usage and rows of the statements of sql commands in `sql_telemetry_pipelines`
+    and the size changes of all tables are stored in the mara db. Needs the permission to load `auto_explain`.
+    """
+    return False
+
+
+def sql_telemetry_pipelines() -> [str]:
+    """The ids of the pipelines (below the root pipeline) for whose sql commands telemetry is recorded"""
+    return ['e_commerce', 'marketing', 'generate_artifacts']
+
+
+def sql_telemetry_min_duration() -> float:
+    """Plans are only recorded for statements that take longer than this many seconds"""
+    return 0.01
+
+
+def sql_telemetry_top_statements() -> int:
+    """How many of the most expensive statements of the last run are shown on pipeline node pages"""
+    return 20
+
+
+def build_cache_row_hashes() -> bool:
+    """
+    When True, the fingerprints of the input and output tables of cached tasks also include a hash of all rows
+    (converts all rows to text, for checking that the row count and transaction id based fingerprints
+    detect all changes)
+    """
+    return False
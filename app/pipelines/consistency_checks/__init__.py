@@ -3,6 +3,9 @@ import pathlib
 from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 
+from app.pipelines import config
+from app.pipelines.date_window import date_window_replacements
+
 pipeline = Pipeline(
     id="consistency_checks",
     description="Runs a set of queries to check the consistency of the transformed data",
@@ -16,3 +19,20 @@ for file in pipeline.base_path().glob('**/*.sql'):
             id=task_id,
             description='Runs file ' + str(relative_path),
             commands=[ExecuteSQL(sql_file_name=str(relative_path), echo_queries=False)]))
+
+
+def customer_consolidation_check() -> str:
+    """
+    Compares the customer consolidation of the e_commerce pipeline with the former (expensive) query,
+    only when `app.pipelines.config.expensive_consistency_checks` is on
+    """
+    if not config.expensive_consistency_checks():
+        return "SELECT 'Skipped, see app.pipelines.config.expensive_consistency_checks';"
+    return (pipeline.base_path().parent / 'e_commerce' / 'check_customer_consolidation.sql').read_text()
+
+
+pipeline.add(Task(
+    id='check_customer_consolidation',
+    description='Compares the customer consolidation with the former query (in CI and benchmark runs)',
+    commands=[ExecuteSQL(sql_statement=customer_consolidation_check, replace=date_window_replacements,
+                         echo_queries=False)]))
@@ -0,0 +1,47 @@
+"""Foreign key constraints of dim tables that are validated separately from adding them"""
+
+from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.pipelines import Pipeline, Task
+
+from . import config
+
+
+def add_fk_function() -> str:
+    """The sql function with which the `constrain_*` functions of the dim tables add foreign keys"""
+    return 'util.add_fk_not_valid' if config.deferred_constraint_validation() else 'util.add_fk'
+
+
+def add_constraint_tasks(pipeline: Pipeline, constrain_functions: {str: str}, schema_name: str,
+                         upstreams: [str]):
+    """
+    Adds a task that calls the `constrain_*` functions of all dim tables of a pipeline one after another, and
+    with deferred validation one task per table that validates its foreign keys.
+
+    Adding a foreign key locks both tables in a mode that conflicts with itself, so adding the keys of different
+    tables at the same time can deadlock. With deferred validation this is short (except for partitioned tables,
+    whose rows are checked right away). The validation only takes locks that do not conflict with each other,
+    so the tables are validated in parallel.
+
+    Args:
+        pipeline: The pipeline to add the tasks to
+        constrain_functions: The `constrain_*` function of each table, by table name
+        schema_name: The schema of the tables
+        upstreams: The tasks that create the tables
+    """
+    pipeline.add(
+        Task(id='add_constraints',
+             description=f'Adds the foreign key constraints of the {", ".join(constrain_functions)} tables',
+             commands=[ExecuteSQL(sql_statement=''.join(f'SELECT {constrain_function}();\n'
+                                                        for constrain_function in constrain_functions.values()),
+                                  echo_queries=False)]),
+        upstreams=upstreams)
+
+    if config.deferred_constraint_validation():
+        for table_name in constrain_functions:
+            pipeline.add(
+                Task(id=f'validate_{table_name}_constraints',
+                     description=f'Validates the foreign key constraints of the {table_name} table',
+                     commands=[ExecuteSQL(sql_statement=f"SELECT util.validate_constraints('{schema_name}', "
+                                                        f"'{table_name}');\n",
+                                          echo_queries=False)]),
+                upstreams=['add_constraints'])
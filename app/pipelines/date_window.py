@@ -0,0 +1,53 @@
+"""Restriction of the processed orders and leads to the days between `app.config.first_date` and `last_date`"""
+
+import mara_db.postgresql
+import sqlalchemy
+from sqlalchemy.ext.declarative import declarative_base
+
+import app.config
+
+Base = declarative_base()
+
+
+class LoadedDateWindow(Base):
+    """The processed days with which the incrementally loaded tables of a schema were last (re)created"""
+    __tablename__ = 'data_integration_loaded_date_window'
+
+    schema_name = sqlalchemy.Column(sqlalchemy.TEXT, primary_key=True)
+    first_date = sqlalchemy.Column(sqlalchemy.DATE, nullable=False)
+    last_date = sqlalchemy.Column(sqlalchemy.DATE, nullable=False)
+
+
+def date_filter(column: str) -> str:
+    """A sql condition that only keeps rows whose date (or timestamp) in `column` is within the processed days"""
+    return f"{column} >= '{app.config.first_date()}' AND {column} < '{app.config.last_date()}'::DATE + 1"
+
+
+date_window_replacements = {'@first_date@': lambda: app.config.first_date(),
+                            '@last_date@': lambda: app.config.last_date()}
+"""Replacements for sql files that filter on the processed days with `@first_date@` and `@last_date@`"""
+
+
+def date_window_changed(schema_name: str) -> bool:
+    """
+    Whether the processed days differ from those with which the tables of a schema were last loaded
+    (or nothing is known about the last load). Incremental loads only copy rows newer than the last loaded ones,
+    so they would never fill in the days that were outside of the previous window.
+    """
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+SELECT first_date, last_date
+FROM data_integration_loaded_date_window
+WHERE schema_name = %s''', (schema_name,))
+        return cursor.fetchone() != (app.config.first_date(), app.config.last_date())
+
+
+def store_date_window(schema_name: str) -> bool:
+    """Remembers the processed days after the tables of a schema were (re)created for them"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+INSERT INTO data_integration_loaded_date_window (schema_name, first_date, last_date)
+VALUES (%s, %s, %s)
+ON CONFLICT (schema_name) DO UPDATE SET first_date = EXCLUDED.first_date, last_date = EXCLUDED.last_date''',
+                       (schema_name, app.config.first_date(), app.config.last_date()))
+    return True
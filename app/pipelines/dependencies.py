@@ -0,0 +1,85 @@
+"""Dependencies between tasks of different sub pipelines"""
+
+import functools
+
+from mara_app.monkey_patch import wrap
+from mara_pipelines import execution, pipelines
+
+cross_pipeline_dependencies: [(pipelines.Node, pipelines.Node)] = []
+"""All dependencies that were added with `add_cross_pipeline_dependency`"""
+
+current_run_nodes: {pipelines.Node} = None
+"""All nodes of the current pipeline run (also in the forked processes of the run and its tasks)"""
+
+
+def add_cross_pipeline_dependency(upstream: pipelines.Node, downstream: pipelines.Node):
+    """
+    Lets a node wait for a node in another sub pipeline, instead of for the whole other pipeline
+
+    Example:
+    >>> add_cross_pipeline_dependency(e_commerce.pipeline.nodes['transform_seller'],
+    ...                               marketing.pipeline.nodes['transform_lead'])
+    """
+    upstream.downstreams.add(downstream)
+    downstream.upstreams.add(upstream)
+    cross_pipeline_dependencies.append((upstream, downstream))
+
+
+def nodes_in_run(pipeline: pipelines.Pipeline, nodes: {pipelines.Node} = None,
+                 with_upstreams: bool = False) -> {pipelines.Node}:
+    """All nodes (including all descendants of pipelines) that are executed in a run of `pipeline`"""
+
+    def with_all_upstreams(nodes: {pipelines.Node}):
+        return functools.reduce(set.union, [with_all_upstreams(node.upstreams) for node in nodes], nodes)
+
+    def with_all_descendants(node: pipelines.Node):
+        return functools.reduce(set.union, [with_all_descendants(child) for child in node.nodes.values()], {node}) \
+            if isinstance(node, pipelines.Pipeline) else {node}
+
+    if nodes:
+        nodes = {node for node in (with_all_upstreams(set(nodes)) if with_upstreams else nodes)
+                 if node.parent == pipeline}
+    else:
+        nodes = {pipeline}
+
+    return functools.reduce(set.union, [with_all_descendants(node) for node in nodes], set())
+
+
+@wrap(execution.run_pipeline)
+def run_pipeline(original_function, pipeline: pipelines.Pipeline, nodes: {pipelines.Node} = None,
+                 with_upstreams: bool = False, interactively_started: bool = False):
+    """
+    Removes cross pipeline dependencies on nodes that are not part of a run (e.g. when only the marketing
+    pipeline is run), as such nodes are never processed and their downstreams would wait forever.
+    Also remembers the nodes of the run, see `is_in_current_run`.
+    """
+    global current_run_nodes
+
+    nodes_to_run = nodes_in_run(pipeline, nodes, with_upstreams)
+    current_run_nodes = nodes_to_run
+    removed_dependencies = [(upstream, downstream) for upstream, downstream in cross_pipeline_dependencies
+                            if downstream in nodes_to_run and upstream not in nodes_to_run]
+
+    def restore_dependencies():
+        for upstream, downstream in removed_dependencies:
+            upstream.downstreams.add(downstream)
+            downstream.upstreams.add(upstream)
+        removed_dependencies.clear()
+
+    for upstream, downstream in removed_dependencies:
+        upstream.downstreams.discard(downstream)
+        downstream.upstreams.discard(upstream)
+
+    try:
+        for event in original_function(pipeline, nodes, with_upstreams, interactively_started):
+            # the run was forked off before the first event, so the original pipeline can be restored
+            restore_dependencies()
+            yield event
+    finally:
+        restore_dependencies()
+        current_run_nodes = None
+
+
+def is_in_current_run(node: pipelines.Node) -> bool:
+    """Whether a node is executed in the current pipeline run"""
+    return current_run_nodes is not None and node in current_run_nodes
@@ -1,8 +1,19 @@
+import datetime
 import pathlib
 
+import mara_db.postgresql
+import mara_pipelines.config
 from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.parallel_tasks.sql import ParallelExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 
+import app.config
+from app.pipelines import config
+from app.pipelines.build_cache import CachedExecuteSQL
+from app.pipelines.constraints import add_constraint_tasks, add_fk_function
+from app.pipelines.date_window import date_window_replacements
+from app.pipelines.session_settings import TunedExecuteSQL, staging_replacements
+
 pipeline = Pipeline(
     id="e_commerce",
     description="Builds the e-commerce cubes and datasets",
@@ -11,7 +22,7 @@ pipeline = Pipeline(
 
 pipeline.add_initial(
     Task(id="initialize_schemas",
-         description="Recreates the schemas of the pipeline",
+         description="Recreates the next schema and creates the tmp schema of the pipeline if missing",
          commands=[
              ExecuteSQL(sql_file_name="recreate_schemas.sql")
          ]))
@@ -21,14 +32,22 @@ pipeline.add(
          description="Preprocess customers and consolidate the data to a single record per customer with "
                      "a unique ID",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_customer.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_customer.sql",
+                              input_tables=['ec_data.order', 'ec_data.customer'],
+                              output_tables=['ec_tmp.customer'], depends_on_current_date=True,
+                              replace={**staging_replacements, **date_window_replacements},
+                              session_settings=config.memory_intensive_session_settings)
          ]))
 
 pipeline.add(
     Task(id="preprocess_order",
          description="Preprocess orders to get correct unique customer ID",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_order.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_order.sql",
+                              input_tables=['ec_data.order', 'ec_data.customer', 'ec_tmp.customer'],
+                              output_tables=['ec_tmp.order'],
+                              replace={**staging_replacements, **date_window_replacements}),
+             ExecuteSQL(sql_file_name="create_order_status_enum.sql")
          ]),
     upstreams=["preprocess_customer"])
 
@@ -36,7 +55,11 @@ pipeline.add(
     Task(id="preprocess_order_item",
          description="Preprocess order items to get correct unique customer ID",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_order_item.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_order_item.sql",
+                              input_tables=['ec_data.order_item', 'ec_tmp.order'],
+                              output_tables=['ec_tmp.order_item'],
+                              replace=staging_replacements,
+                              session_settings=config.memory_intensive_session_settings)
          ]),
     upstreams=["preprocess_order"])
 
@@ -44,21 +67,32 @@ pipeline.add(
     Task(id="preprocess_product",
          description="Preprocess products with product category in English",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_product.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_product.sql",
+                              input_tables=['ec_data.product', 'ec_data.product_category_name_translation'],
+                              output_tables=['ec_tmp.product'],
+                              replace=staging_replacements),
+             ExecuteSQL(sql_file_name="create_product_category_enum.sql")
          ]))
 
 pipeline.add(
     Task(id="preprocess_seller",
          description="Preprocess sellers and compute the seller's first order",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_seller.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_seller.sql",
+                              input_tables=['ec_data.order_item', 'ec_data.order', 'ec_data.seller'],
+                              output_tables=['ec_tmp.seller'],
+                              replace={**staging_replacements, **date_window_replacements},
+                              session_settings=config.memory_intensive_session_settings)
          ]))
 
 pipeline.add(
     Task(id="preprocess_zip_code",
          description="Preprocess and collect zip codes from all data",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_zip_code.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_zip_code.sql",
+                              input_tables=['ec_data.geolocation', 'ec_tmp.seller', 'ec_tmp.customer'],
+                              output_tables=['ec_tmp.zip_code'],
+                              replace=staging_replacements)
          ]),
     upstreams=["preprocess_seller", "preprocess_customer"])
 
@@ -74,7 +108,7 @@ pipeline.add(
     Task(id="transform_seller",
          description="Creates the seller dim table",
          commands=[
-             ExecuteSQL(sql_file_name="transform_seller.sql")
+             ExecuteSQL(sql_file_name="transform_seller.sql", replace={'@add_fk@': add_fk_function})
          ]),
     upstreams=["preprocess_order_item", "preprocess_seller"])
 
@@ -82,7 +116,7 @@ pipeline.add(
     Task(id="transform_order",
          description="Creates the order dim table",
          commands=[
-             ExecuteSQL(sql_file_name="transform_order.sql")
+             ExecuteSQL(sql_file_name="transform_order.sql", replace={'@add_fk@': add_fk_function})
          ]),
     upstreams=["preprocess_order"])
 
@@ -90,16 +124,54 @@ pipeline.add(
     Task(id="transform_customer",
          description="Creates the customer dim table",
          commands=[
-             ExecuteSQL(sql_file_name="transform_customer.sql")
+             TunedExecuteSQL(sql_file_name="transform_customer.sql", replace={'@add_fk@': add_fk_function},
+                             session_settings=config.memory_intensive_session_settings)
          ]),
     upstreams=["preprocess_order_item", "preprocess_product"])
 
+
+def order_item_partitions() -> [(str, str)]:
+    """
+    The date ranges of the partitions of ec_dim_next.order_item (the default partition holds all earlier dates).
+    Computed from ec_tmp.order_item like the partitions in transform_order_item.sql, because this runs before
+    the commands of the task, i.e. before the partitioned table is created.
+    """
+    with mara_db.postgresql.postgres_cursor_context(mara_pipelines.config.default_db_alias()) as cursor:
+        cursor.execute('''
+SELECT generate_series(date_trunc('month', greatest(min(order_date), %s)),
+                       date_trunc('month', max(order_date)), INTERVAL '1 month') :: DATE
+FROM ec_tmp.order_item''', (app.config.first_date(),))
+        months = [month for month, in cursor.fetchall()]
+
+    if not months:
+        return [('-infinity', 'infinity')]
+
+    partitions = [('-infinity', str(months[0]))]
+    for month in months:
+        next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        partitions.append((str(month), str(next_month)))
+    return partitions
+
+
 pipeline.add(
-    Task(id="transform_order_item",
-         description="Creates the order_item dim table",
-         commands=[
-             ExecuteSQL(sql_file_name="transform_order_item.sql")
-         ]),
+    ParallelExecuteSQL(
+        id="transform_order_item",
+        description="Creates the order_item dim table, partitioned by month, and fills its partitions in parallel",
+        commands_before=[
+            ExecuteSQL(sql_file_name="transform_order_item.sql",
+                       replace={'@add_fk@': add_fk_function, **date_window_replacements})
+        ],
+        parameter_function=order_item_partitions,
+        parameter_placeholders=['@from_date@', '@to_date@'],
+        file_name="load_order_item_partition.sql",
+        commands_after=[
+            ExecuteSQL(sql_statement="""
+SELECT util.add_index('ec_dim_next', 'order_item',
+                      column_names := ARRAY ['order_fk', 'customer_fk', 'product_fk', 'seller_fk']);
+
+ANALYZE ec_dim_next.order_item;
+""")
+        ]),
     upstreams=["preprocess_order_item"])
 
 pipeline.add(
@@ -110,18 +182,15 @@ pipeline.add(
          ]),
     upstreams=["preprocess_product", "preprocess_order_item"])
 
-pipeline.add(
-    Task(id="constrain_tables",
-         description="Adds foreign key constrains between the dim tables",
-         commands=[
-             ExecuteSQL(sql_file_name="constrain_tables.sql", echo_queries=False)
-         ]),
-    upstreams=["transform_seller",
-               "transform_customer",
-               "transform_order_item",
-               "transform_order",
-               "transform_product",
-               "transform_zip_code"])
+# the foreign keys are added one table after another and then validated per table in parallel
+add_constraint_tasks(pipeline,
+                     {'order': 'ec_tmp.constrain_orders',
+                      'order_item': 'ec_tmp.constrain_order_item',
+                      'customer': 'ec_tmp.constrain_customer',
+                      'seller': 'ec_tmp.constrain_sellers'},
+                     schema_name='ec_dim_next',
+                     upstreams=["transform_order", "transform_order_item", "transform_customer", "transform_product",
+                                "transform_seller", "transform_zip_code"])
 
 pipeline.add_final(
     Task(id="replace_schema",
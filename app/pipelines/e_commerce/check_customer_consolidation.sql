@@ -0,0 +1,79 @@
+-- Compares the result of the single-pass customer consolidation in e_commerce/preprocess_customer.sql with the
+-- former query based on separate first_value windows. Only customers with orders and without ties in their order
+-- timestamps are compared, because for the others the former query picks arbitrary rows.
+-- Repeats the expensive former query, therefore only run by the consistency checks in CI and benchmark runs
+-- (see app.pipelines.config.expensive_consistency_checks) or with `flask app.pipelines.check-customer-consolidation`.
+
+SELECT util.assert_not_found(
+               'The customer consolidation should give the same result as the former first_value based query',
+               'WITH
+       customer_orders AS (
+           SELECT DISTINCT customer.customer_unique_id,
+                           first_value(zip_code_prefix)
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp DESC)                   AS zip_code,
+                           first_value(initcap(city))
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp DESC)                   AS city,
+                           first_value(state)
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp DESC)                   AS state,
+                           first_value(order_id)
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp ASC)            AS first_order_id,
+                           first_value(order_purchase_timestamp)
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp ASC)            AS first_order_date,
+                           first_value(order_id)
+                           OVER (PARTITION BY customer_unique_id
+                               ORDER BY order_purchase_timestamp DESC)           AS last_order_id,
+                           now() :: DATE
+                               - MIN(order_purchase_timestamp)
+                                 OVER (PARTITION BY customer_unique_id) :: DATE AS days_since_first_order,
+                           now() :: DATE
+                               - MAX(order_purchase_timestamp)
+                                 OVER (PARTITION BY customer_unique_id) :: DATE AS days_since_last_order
+           FROM ec_data.order
+                    LEFT JOIN ec_data.customer USING (customer_id)
+           WHERE order_purchase_timestamp >= ''@first_date@'' AND order_purchase_timestamp < ''@last_date@''::DATE + 1
+       ),
+
+       reference AS (
+       SELECT DISTINCT customer.customer_unique_id            AS customer_id,
+                       first_value(coalesce(customer_orders.zip_code, customer.zip_code_prefix))
+                       OVER (PARTITION BY customer_unique_id) AS zip_code,
+                       customer_orders.first_order_id         AS first_order_id,
+                       customer_orders.first_order_date       AS first_order_date,
+                       customer_orders.last_order_id          AS last_order_id,
+                       first_value(coalesce(customer_orders.city, customer.city))
+                       OVER (PARTITION BY customer_unique_id) AS city,
+                       first_value(coalesce(customer_orders.state, customer.state))
+                       OVER (PARTITION BY customer_unique_id) AS state,
+                       customer_orders.days_since_first_order AS days_since_first_order,
+                       customer_orders.days_since_last_order  AS days_since_last_order
+
+       FROM ec_data.customer
+                LEFT JOIN customer_orders USING (customer_unique_id)
+       ),
+
+       comparable_customer AS (
+           SELECT customer_unique_id AS customer_id
+           FROM ec_data.order
+                    JOIN ec_data.customer USING (customer_id)
+           WHERE order_purchase_timestamp >= ''@first_date@'' AND order_purchase_timestamp < ''@last_date@''::DATE + 1
+           GROUP BY customer_unique_id
+           HAVING count(*) = count(DISTINCT order_purchase_timestamp)
+       )
+
+       (SELECT * FROM reference JOIN comparable_customer USING (customer_id)
+        EXCEPT
+        SELECT * FROM ec_tmp.customer JOIN comparable_customer USING (customer_id))
+       UNION ALL
+       (SELECT * FROM ec_tmp.customer JOIN comparable_customer USING (customer_id)
+        EXCEPT
+        SELECT * FROM reference JOIN comparable_customer USING (customer_id))');
+
+SELECT util.assert_equal(
+               'The customer consolidation should give the same number of customers as the former query',
+               'SELECT count(DISTINCT customer_unique_id) FROM ec_data.customer',
+               'SELECT count(*) FROM ec_tmp.customer');
@@ -1,4 +0,0 @@
-SELECT ec_tmp.constrain_orders();
-SELECT ec_tmp.constrain_order_item();
-SELECT ec_tmp.constrain_customer();
-SELECT ec_tmp.constrain_sellers();
@@ -0,0 +1,3 @@
+SELECT util.create_enum(
+               'ec_dim_next.ORDER_STATUS',
+               (SELECT array_agg(DISTINCT order_status) FROM ec_tmp.order));
@@ -0,0 +1,5 @@
+SELECT util.create_enum(
+               'ec_dim_next.PRODUCT_CATEGORY',
+               (SELECT array_agg(DISTINCT product_category)
+                FROM ec_tmp.product
+                WHERE product_category IS NOT NULL));
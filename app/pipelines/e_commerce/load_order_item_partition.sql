@@ -0,0 +1,15 @@
+-- Fills a single month partition of the order_item dim table (or the default partition for older order items)
+INSERT INTO ec_dim_next.order_item
+SELECT order_item_id,
+       order_date,
+       order_id    AS order_fk,
+       customer_id AS customer_fk,
+       product_id  AS product_fk,
+       seller_id   AS seller_fk,
+
+       is_first_order_id,
+
+       product_revenue,
+       shipping_revenue
+FROM ec_tmp.order_item
+WHERE order_date >= '@from_date@' AND order_date < '@to_date@';
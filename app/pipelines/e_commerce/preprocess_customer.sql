@@ -15,56 +15,51 @@ CREATE TABLE ec_tmp.customer
 
 );
 
+-- All order attributes of a customer are computed in a single sort of the customer's orders (latest first):
+-- The first row of each customer is the last order, the aggregates over the whole partition give the first order.
+-- Order ids break ties between orders with the same purchase timestamp.
 WITH customer_orders AS (
-    SELECT DISTINCT customer.customer_unique_id,
-                    first_value(zip_code_prefix)
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp DESC)                   AS zip_code,
-                    first_value(initcap(city))
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp DESC)                   AS city,
-                    first_value(state)
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp DESC)                   AS state,
-                    first_value(order_id)
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp ASC)            AS first_order_id,
-                    first_value(order_purchase_timestamp)
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp ASC)            AS first_order_date,
-                    first_value(order_id)
-                    OVER (PARTITION BY customer_unique_id
-                        ORDER BY order_purchase_timestamp DESC)           AS last_order_id,
-                    now() :: DATE
-                        - MIN(order_purchase_timestamp)
-                          OVER (PARTITION BY customer_unique_id) :: DATE AS days_since_first_order,
-                    now() :: DATE
-                        - MAX(order_purchase_timestamp)
-                          OVER (PARTITION BY customer_unique_id) :: DATE AS days_since_last_order
+    SELECT DISTINCT ON (customer_unique_id) customer_unique_id,
+                                            zip_code_prefix                      AS zip_code,
+                                            initcap(city)                        AS city,
+                                            state                                AS state,
+                                            last_value(order_id) OVER orders     AS first_order_id,
+                                            min(order_purchase_timestamp) OVER orders
+                                                                                 AS first_order_date,
+                                            order_id                             AS last_order_id,
+                                            now() :: DATE
+                                                - (min(order_purchase_timestamp) OVER orders) :: DATE
+                                                                                 AS days_since_first_order,
+                                            now() :: DATE
+                                                - (max(order_purchase_timestamp) OVER orders) :: DATE
+                                                                                 AS days_since_last_order
     FROM ec_data.order
-             LEFT JOIN ec_data.customer USING (customer_id)
+             JOIN ec_data.customer USING (customer_id)
+    WHERE order_purchase_timestamp >= '@first_date@' AND order_purchase_timestamp < '@last_date@'::DATE + 1
+    WINDOW orders AS (PARTITION BY customer_unique_id
+        ORDER BY order_purchase_timestamp DESC, order_id DESC
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+    ORDER BY customer_unique_id, order_purchase_timestamp DESC, order_id DESC
 )
 
 -- Customers get different ids for different orders -> Deduplication on customer_unique_id
 -- Keep the last order's customer data across distinct customer_unique_id
--- If there is no order data (this is because the order data was not sampled), keep the first_value
+-- If there is no order data (this is because the order data was not sampled), keep the data of the first customer id
 INSERT
 INTO ec_tmp.customer
-SELECT DISTINCT customer.customer_unique_id            AS customer_id,
-                first_value(coalesce(customer_orders.zip_code, customer.zip_code_prefix))
-                OVER (PARTITION BY customer_unique_id) AS zip_code,
-                customer_orders.first_order_id         AS first_order_id,
-                customer_orders.first_order_date       AS first_order_date,
-                customer_orders.last_order_id          AS last_order_id,
-                first_value(coalesce(customer_orders.city, customer.city))
-                OVER (PARTITION BY customer_unique_id) AS city,
-                first_value(coalesce(customer_orders.state, customer.state))
-                OVER (PARTITION BY customer_unique_id) AS state,
-                customer_orders.days_since_first_order AS days_since_first_order,
-                customer_orders.days_since_last_order  AS days_since_last_order
+SELECT DISTINCT ON (customer_unique_id) customer.customer_unique_id                                  AS customer_id,
+                                        coalesce(customer_orders.zip_code, customer.zip_code_prefix) AS zip_code,
+                                        customer_orders.first_order_id                               AS first_order_id,
+                                        customer_orders.first_order_date                             AS first_order_date,
+                                        customer_orders.last_order_id                                AS last_order_id,
+                                        coalesce(customer_orders.city, customer.city)                AS city,
+                                        coalesce(customer_orders.state, customer.state)              AS state,
+                                        customer_orders.days_since_first_order                       AS days_since_first_order,
+                                        customer_orders.days_since_last_order                        AS days_since_last_order
 
 FROM ec_data.customer
-         LEFT JOIN customer_orders USING (customer_unique_id);
+         LEFT JOIN customer_orders USING (customer_unique_id)
+ORDER BY customer_unique_id, customer.customer_id;
 
 SELECT util.add_index('ec_tmp', 'customer', column_names := ARRAY ['customer_id']);
 
@@ -26,6 +26,8 @@ WITH order_with_unique_customer_id AS (
            order_delivered_customer_date::DATE - order_purchase_timestamp::DATE AS days_of_delivery
     FROM ec_data.order
              LEFT JOIN ec_data.customer USING (customer_id)
+    -- only orders within the processed days (see app.pipelines.date_window)
+    WHERE order_purchase_timestamp >= '@first_date@' AND order_purchase_timestamp < '@last_date@'::DATE + 1
 )
 
 INSERT
@@ -45,8 +47,4 @@ FROM order_with_unique_customer_id
 
 SELECT util.add_index('ec_tmp', 'order', column_names := ARRAY ['order_id', 'customer_id']);
 
-ANALYZE ec_tmp.order;
-
-SELECT util.create_enum(
-               'ec_dim_next.ORDER_STATUS',
-               (SELECT array_agg(DISTINCT order_status) FROM ec_tmp.order));
\ No newline at end of file
+ANALYZE ec_tmp.order;
\ No newline at end of file
@@ -4,6 +4,7 @@ CREATE TABLE ec_tmp.order_item
 (
     order_item_id     TEXT             NOT NULL, --sequential number identifying number of items included in the same order.
     order_id          TEXT             NOT NULL, --order unique identifier
+    order_date        DATE             NOT NULL, --the day of the order
     customer_id       TEXT             NOT NULL, -- Unique identifier of a customer
     product_id        TEXT             NOT NULL, --product unique identifier
     seller_id         TEXT             NOT NULL, --seller unique identifier
@@ -16,6 +17,7 @@ CREATE TABLE ec_tmp.order_item
 INSERT INTO ec_tmp.order_item
 SELECT order_id || '_' || order_item_id AS order_item_id, -- create a unique order_item_id
        order_id,
+       "order".order_date::DATE         AS order_date,
        "order".customer_id              AS customer_id,
        product_id,
        seller_id,
@@ -38,6 +40,6 @@ FROM ec_data.order_item
 WHERE "order".order_id IS NOT NULL;
 
 SELECT util.add_index('ec_tmp', 'order_item',
-                      column_names := ARRAY ['order_item_id', 'order_id', 'product_id', 'seller_id']);
+                      column_names := ARRAY ['order_item_id', 'order_id', 'order_date', 'product_id', 'seller_id']);
 
 ANALYZE ec_tmp.order_item;
\ No newline at end of file
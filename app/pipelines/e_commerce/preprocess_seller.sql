@@ -15,7 +15,8 @@ WITH seller_orders AS (
                     OVER (PARTITION BY order_item.seller_id
                         ORDER BY "order".order_purchase_timestamp ASC) AS first_order_id
     FROM ec_data.order_item
-             LEFT JOIN ec_data.order USING (order_id)
+             JOIN ec_data.order USING (order_id)
+    WHERE order_purchase_timestamp >= '@first_date@' AND order_purchase_timestamp < '@last_date@'::DATE + 1
 )
 
 INSERT
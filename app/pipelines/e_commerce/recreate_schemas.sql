@@ -1,5 +1,5 @@
 DROP SCHEMA IF EXISTS ec_dim_next CASCADE;
 CREATE SCHEMA ec_dim_next;
 
-DROP SCHEMA IF EXISTS ec_tmp CASCADE;
-CREATE SCHEMA ec_tmp;
+-- Kept between runs so that unchanged preprocessing results can be reused (see app.pipelines.build_cache)
+CREATE SCHEMA IF NOT EXISTS ec_tmp;
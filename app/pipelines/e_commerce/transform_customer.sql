@@ -60,8 +60,8 @@ ANALYZE ec_dim_next.customer;
 CREATE OR REPLACE FUNCTION ec_tmp.constrain_customer()
     RETURNS VOID AS
 $$
-SELECT util.add_fk('ec_dim_next', 'customer', 'ec_dim_next', 'zip_code');
-SELECT util.add_fk('ec_dim_next', 'customer', 'first_order_fk', 'ec_dim_next', 'order');
-SELECT util.add_fk('ec_dim_next', 'customer', 'last_order_fk', 'ec_dim_next', 'order');
+SELECT @add_fk@('ec_dim_next', 'customer', 'ec_dim_next', 'zip_code');
+SELECT @add_fk@('ec_dim_next', 'customer', 'first_order_fk', 'ec_dim_next', 'order');
+SELECT @add_fk@('ec_dim_next', 'customer', 'last_order_fk', 'ec_dim_next', 'order');
 $$
     LANGUAGE sql;
@@ -37,6 +37,6 @@ ANALYZE ec_dim_next.order;
 CREATE OR REPLACE FUNCTION ec_tmp.constrain_orders()
     RETURNS VOID AS
 $$
-SELECT util.add_fk('ec_dim_next', 'order', 'ec_dim_next', 'customer');
+SELECT @add_fk@('ec_dim_next', 'order', 'ec_dim_next', 'customer');
 $$
     LANGUAGE sql;
@@ -2,41 +2,46 @@ DROP TABLE IF EXISTS ec_dim_next.order_item CASCADE;
 
 CREATE TABLE ec_dim_next.order_item
 (
-    order_item_id     TEXT             NOT NULL PRIMARY KEY, -- sequential number identifying number of items included in the same order.
-    order_fk          TEXT             NOT NULL,             -- order unique identifier
-    customer_fk       TEXT             NOT NULL,             -- Unique identifier of a customer
-    product_fk        TEXT             NOT NULL,             -- product unique identifier
-    seller_fk         TEXT             NOT NULL,             -- seller unique identifier
+    order_item_id     TEXT             NOT NULL, -- sequential number identifying number of items included in the same order.
+    order_date        DATE             NOT NULL, -- the day of the order, by which the table is partitioned
+    order_fk          TEXT             NOT NULL, -- order unique identifier
+    customer_fk       TEXT             NOT NULL, -- Unique identifier of a customer
+    product_fk        TEXT             NOT NULL, -- product unique identifier
+    seller_fk         TEXT             NOT NULL, -- seller unique identifier
     is_first_order_id TEXT,
 
-    product_revenue   DOUBLE PRECISION NOT NULL,             -- item price
-    shipping_revenue  DOUBLE PRECISION NOT NULL              -- item freight value item (if an order has more than one item the freight value is split between items)
-);
+    product_revenue   DOUBLE PRECISION NOT NULL, -- item price
+    shipping_revenue  DOUBLE PRECISION NOT NULL, -- item freight value item (if an order has more than one item the freight value is split between items)
 
-INSERT INTO ec_dim_next.order_item
-SELECT order_item_id,
-       order_id    AS order_fk,
-       customer_id AS customer_fk,
-       product_id  AS product_fk,
-       seller_id   AS seller_fk,
+    PRIMARY KEY (order_item_id, order_date)
+) PARTITION BY RANGE (order_date);
 
-       is_first_order_id,
-
-       product_revenue,
-       shipping_revenue
-FROM ec_tmp.order_item;
-
-SELECT util.add_index('ec_dim_next', 'order_item',
-                      column_names := ARRAY ['order_fk', 'customer_fk', 'product_fk', 'seller_fk']);
-
-ANALYZE ec_dim_next.order_item;
+-- One partition per month from the first date until the last order, older order items go to the default partition
+DO
+$$
+    DECLARE
+        month DATE;
+    BEGIN
+        FOR month IN SELECT generate_series(date_trunc('month', greatest(first_order_date, '@first_date@'::DATE)),
+                                            date_trunc('month', last_order_date), INTERVAL '1 month')::DATE
+                     FROM (SELECT min(order_date) AS first_order_date, max(order_date) AS last_order_date
+                           FROM ec_tmp.order_item) order_dates
+            LOOP
+                EXECUTE format('CREATE TABLE ec_dim_next.%I PARTITION OF ec_dim_next.order_item '
+                                   || 'FOR VALUES FROM (%L) TO (%L)',
+                               'order_item_' || to_char(month, 'YYYY_MM'), month, (month + INTERVAL '1 month')::DATE);
+            END LOOP;
+    END
+$$;
+
+CREATE TABLE ec_dim_next.order_item_default PARTITION OF ec_dim_next.order_item DEFAULT;
 
 CREATE OR REPLACE FUNCTION ec_tmp.constrain_order_item()
     RETURNS VOID AS
 $$
-SELECT util.add_fk('ec_dim_next', 'order_item', 'ec_dim_next', 'order');
-SELECT util.add_fk('ec_dim_next', 'order_item', 'ec_dim_next', 'customer');
-SELECT util.add_fk('ec_dim_next', 'order_item', 'ec_dim_next', 'product');
-SELECT util.add_fk('ec_dim_next', 'order_item', 'ec_dim_next', 'seller');
+SELECT @add_fk@('ec_dim_next', 'order_item', 'ec_dim_next', 'order');
+SELECT @add_fk@('ec_dim_next', 'order_item', 'ec_dim_next', 'customer');
+SELECT @add_fk@('ec_dim_next', 'order_item', 'ec_dim_next', 'product');
+SELECT @add_fk@('ec_dim_next', 'order_item', 'ec_dim_next', 'seller');
 $$
     LANGUAGE sql;
@@ -42,7 +42,7 @@ ANALYZE ec_dim_next.seller;
 CREATE OR REPLACE FUNCTION ec_tmp.constrain_sellers()
     RETURNS VOID AS
 $$
-SELECT util.add_fk('ec_dim_next', 'seller', 'ec_dim_next', 'zip_code');
-SELECT util.add_fk('ec_dim_next', 'seller', 'first_order_fk', 'ec_dim_next', 'order');
+SELECT @add_fk@('ec_dim_next', 'seller', 'ec_dim_next', 'zip_code');
+SELECT @add_fk@('ec_dim_next', 'seller', 'first_order_fk', 'ec_dim_next', 'order');
 $$
     LANGUAGE sql;
@@ -1,33 +1,67 @@
+import functools
 import pathlib
 
 from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 
-pipeline = Pipeline(
-    id="generate_artifacts",
-    description="Create flattened data set tables for various front-ends",
-    base_path=pathlib.Path(__file__).parent)
 
-from .metabase import pipeline as metabase_pipeline
+@functools.lru_cache(maxsize=None)
+def _pipeline() -> Pipeline:
+    pipeline = Pipeline(
+        id="generate_artifacts",
+        description="Create flattened data set tables for various front-ends",
+        base_path=pathlib.Path(__file__).parent)
 
-pipeline.add(metabase_pipeline)
+    from .flatten_data_sets import pipeline as flatten_data_sets_pipeline
 
-from .mara_data_explorer import pipeline as mara_data_explorer_pipeline
+    pipeline.add(flatten_data_sets_pipeline)
 
-pipeline.add(mara_data_explorer_pipeline)
+    from .metabase import pipeline as metabase_pipeline
 
-from .mondrian import pipeline as mondrian_pipeline
+    pipeline.add(metabase_pipeline, upstreams=['flatten_data_sets'])
 
-pipeline.add(mondrian_pipeline)
+    from .mara_data_explorer import pipeline as mara_data_explorer_pipeline
 
+    pipeline.add(mara_data_explorer_pipeline, upstreams=['flatten_data_sets'])
 
-pipeline.add_final(
-    Task(id='replace_schemas',
-         description='Replaces the frontend schemas with their next versions',
-         commands=[
-             ExecuteSQL(sql_file_name='switch_metabase_schema.sql', db_alias='metabase-data-write'),
+    from .hll_rollups import pipeline as hll_rollups_pipeline
 
-             ExecuteSQL(sql_statement=f"SELECT util.replace_schema('data_sets', 'data_sets_next')", db_alias='dwh'),
-             ExecuteSQL(sql_statement=f"SELECT util.replace_schema('mondrian', 'mondrian_next')", db_alias='dwh')
-         ]))
+    pipeline.add(hll_rollups_pipeline, upstreams=['flatten_data_sets'])
 
+    # the distinct counts in Metabase are computed from the HyperLogLog sketches
+    from app.pipelines.dependencies import add_cross_pipeline_dependency
+    from app.schema.approximate_distinct_counts import hll_rollups
+
+    for data_set_id in hll_rollups:
+        add_cross_pipeline_dependency(hll_rollups_pipeline.nodes[f'create_{data_set_id}_hll_rollup'],
+                                      metabase_pipeline.nodes[f'create_{data_set_id}_distinct_counts_for_metabase'])
+
+    from .mondrian import pipeline as mondrian_pipeline
+
+    pipeline.add(mondrian_pipeline)
+
+    pipeline.add_final(
+        Task(id='replace_schemas',
+             description='Replaces the frontend schemas with their next versions',
+             commands=[
+                 ExecuteSQL(sql_file_name='switch_metabase_schema.sql', db_alias='metabase-data-write'),
+
+                 ExecuteSQL(sql_statement=f"SELECT util.replace_schema('data_sets', 'data_sets_next')",
+                            db_alias='dwh'),
+                 ExecuteSQL(sql_statement=f"SELECT util.replace_schema('mondrian', 'mondrian_next')",
+                            db_alias='dwh'),
+                 ExecuteSQL(sql_statement=f"SELECT util.replace_schema('hll_rollups', 'hll_rollups_next')",
+                            db_alias='dwh')
+             ]))
+
+    return pipeline
+
+
+def __getattr__(name: str):
+    """
+    Builds `pipeline` on first access, as its sub pipelines iterate over all data sets.
+    Importing the cli module of this package (for registering its commands) then does not load any data set.
+    """
+    if name == 'pipeline':
+        return _pipeline()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
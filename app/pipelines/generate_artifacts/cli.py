@@ -0,0 +1,92 @@
+"""Command line interface for comparing the storage formats of data set tables"""
+
+import statistics
+import time
+
+import click
+import mara_db.postgresql
+from mara_schema.config import data_sets
+
+from .storage_formats import create_table_for_query, date_column, finalize_table, storage_formats
+
+
+@click.command()
+@click.option('--data-set', 'data_set_name', default='Order items',
+              help='The name of the data set to use. Default: "Order items".')
+@click.option('--db-alias', default='dwh', help='The database to benchmark in. Default: "dwh".')
+@click.option('--formats', default=','.join(storage_formats),
+              help=f'The storage formats to compare, separated by comma. Default: "{",".join(storage_formats)}".')
+@click.option('--repetitions', default=5, help='How often to run each query. Default: 5.')
+def benchmark_storage_formats(data_set_name: str, db_alias: str, formats: str, repetitions: int):
+    """
+    Measures load time, size and query latency of the data explorer table of a data set for each storage format.
+    Needs the flattened data set tables of a previous pipeline run.
+    """
+    # builds the flatten_data_sets pipeline, which is not needed for registering the command
+    from .flatten_data_sets import flattened_data_set_query, flattened_table_name
+
+    data_set = next((ds for ds in data_sets() if ds.name == data_set_name), None)
+    if not data_set:
+        raise click.ClickException(f'Data set "{data_set_name}" not found')
+
+    column = date_column(data_set)
+    if not column:
+        raise click.ClickException(f'Data set "{data_set.name}" has no date attribute')
+
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        cursor.execute('SELECT to_regclass(%s)', (flattened_table_name(data_set),))
+        if not cursor.fetchone()[0]:
+            raise click.ClickException(f'{flattened_table_name(data_set)} does not exist, '
+                                       f'please run the generate_artifacts pipeline first')
+        cursor.execute(f'SELECT max("{column}") FROM {flattened_table_name(data_set)}')
+        last_date = cursor.fetchone()[0]
+
+        cursor.execute('DROP SCHEMA IF EXISTS storage_format_benchmark CASCADE; '
+                       'CREATE SCHEMA storage_format_benchmark')
+
+    query = flattened_data_set_query(data_set, pre_computed_metrics=True, personal_data=True)
+
+    # typical front-end queries: a filter on the last quarter and a group-by over the whole table
+    frontend_queries = {
+        'filter': f'''
+SELECT "{column}", count(*) FROM storage_format_benchmark.{{table}}
+WHERE "{column}" >= '{last_date}'::DATE - 90
+GROUP BY 1''',
+        'group-by': f'''
+SELECT date_trunc('month', "{column}"), count(*) FROM storage_format_benchmark.{{table}}
+GROUP BY 1'''}
+
+    print(f'{"format":<18} {"load":>9} {"size":>10} ' + ' '.join([f'{name:>10}' for name in frontend_queries]))
+    for storage_format in formats.split(','):
+        create_table_for_query(query, 'storage_format_benchmark', storage_format, db_alias,
+                               storage_format=storage_format, date_column=column, source_db_alias=db_alias)
+        start_time = time.time()
+        with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+            cursor.execute(f'INSERT INTO storage_format_benchmark.{storage_format} {query}')
+        finalize_table('storage_format_benchmark', storage_format, db_alias,
+                       storage_format=storage_format, date_column=column)
+        load_time = time.time() - start_time
+
+        with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+            table = f'storage_format_benchmark.{storage_format}'
+            if storage_format.startswith('cstore'):
+                cursor.execute('SELECT cstore_table_size(%s)', (table,))
+            else:
+                cursor.execute('SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(%s)', (table,))
+            size = cursor.fetchone()[0]
+
+            latencies = []
+            for frontend_query in frontend_queries.values():
+                durations = []
+                for _ in range(repetitions):
+                    start_time = time.time()
+                    cursor.execute(frontend_query.format(table=storage_format))
+                    cursor.fetchall()
+                    durations.append(time.time() - start_time)
+                latencies.append(statistics.median(durations))
+
+        print(f'{storage_format:<18} {load_time:8.2f}s {size / 1024 / 1024:8.1f}MB '
+              + ' '.join([f'{latency * 1000:8.1f}ms' for latency in latencies]))
+
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:
+        cursor.execute('DROP SCHEMA storage_format_benchmark CASCADE')
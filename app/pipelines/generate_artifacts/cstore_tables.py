@@ -1,30 +1,50 @@
-from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.logging import logger
 
+from app.connection_pool import connection_context
 
-def create_cstore_table_for_query(sql_select_statement, database_schema, table_name, db_alias):
+
+def column_definitions(sql_select_statement: str, db_alias: str) -> [(str, str)]:
     """
-    Create a cstore table for a that can take the output of a select statement.
-    This function is needed because PostgreSQL does not have 'CREATE FOREIGN TABLE AS ... '
+    Returns the names and types of the result columns of a select statement without running it:
+    The statement is only parsed into a temporary view, whose columns are then read from the catalog.
     """
-    import mara_db.postgresql
+    # the temporary view is created in a transaction that is rolled back when the connection is returned
+    with connection_context(db_alias) as connection, connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMPORARY VIEW column_definitions AS {sql_select_statement}')
+        cursor.execute('''
+SELECT attname, format_type(atttypid, atttypmod)
+FROM pg_attribute
+WHERE attrelid = 'pg_temp.column_definitions'::REGCLASS AND attnum > 0
+ORDER BY attnum''')
+        return cursor.fetchall()
 
-    with mara_db.postgresql.postgres_cursor_context('dwh') as cursor:
-        cursor.execute('SELECT oid, typname FROM pg_type;')
-        db_types = {}
-        for oid, type_name in cursor.fetchall():
-            db_types[oid] = type_name
 
-        cursor.execute(sql_select_statement + ' LIMIT 0')
+def create_cstore_table_for_query(sql_select_statement, database_schema, table_name, db_alias,
+                                  source_db_alias='dwh', compression='pglz'):
+    """
+    Create a cstore table for a that can take the output of a select statement.
+    This function is needed because PostgreSQL does not have 'CREATE FOREIGN TABLE AS ... '
 
-        column_specs = []
-        for column in cursor.description:
-            column_specs.append(f'"{column.name}" {db_types[column.type_code]}')
+    Args:
+        sql_select_statement: The query whose result is later inserted into the table
+        database_schema: The schema of the table
+        table_name: The name of the table
+        db_alias: The database in which the table is created
+        source_db_alias: The database in which the select statement runs
+        compression: 'pglz' or 'none'
+    """
+    column_specs = [f'"{column_name}" {column_type}'
+                    for column_name, column_type in column_definitions(sql_select_statement, source_db_alias)]
 
-        ddl = f"""
+    ddl = f"""
 DROP FOREIGN TABLE IF EXISTS "{database_schema}"."{table_name}";
 CREATE FOREIGN TABLE "{database_schema}"."{table_name}" (
-"""
-        ddl += ',\n    '.join(column_specs)
-        ddl += "\n) SERVER cstore_server OPTIONS (compression 'pglz');"
+    """
+    ddl += ',\n    '.join(column_specs)
+    ddl += f"\n) SERVER cstore_server OPTIONS (compression '{compression}');"
 
-        return ExecuteSQL(sql_statement=ddl, echo_queries=True, db_alias=db_alias).run()
\ No newline at end of file
+    logger.log(ddl, format=logger.Format.VERBATIM)
+    with connection_context(db_alias) as connection, connection.cursor() as cursor:
+        connection.autocommit = True
+        cursor.execute(ddl)
+    return True
@@ -0,0 +1,80 @@
+import pathlib
+
+from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.pipelines import Pipeline, Task
+from mara_schema.config import data_sets
+from mara_schema.data_set import DataSet
+from mara_schema.metric import SimpleMetric, Aggregation
+from mara_schema.sql_generation import data_set_sql_query
+
+pipeline = Pipeline(
+    id="flatten_data_sets",
+    description="Flattens each data set once into a table with all attributes and simple metrics, "
+                "from which the tables of the front-ends are projected",
+    base_path=pathlib.Path(__file__).parent,
+    labels={"Schema": 'data_sets_tmp'})
+
+pipeline.add_initial(
+    Task(
+        id="initialize_schema",
+        description="Recreates the data_sets_tmp schema",
+        commands=[
+            ExecuteSQL(sql_statement=f"""
+DROP SCHEMA IF EXISTS data_sets_tmp CASCADE;
+CREATE SCHEMA data_sets_tmp;
+""", echo_queries=False)]))
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def flattened_table_name(data_set: DataSet) -> str:
+    return f'data_sets_tmp.{quote(data_set.id())}'
+
+
+for data_set in data_sets():
+    pipeline.add(
+        Task(id=f"flatten_{data_set.id()}",
+             description=f'Flattens the "{data_set.name}" data set with all attributes and simple metrics',
+             commands=[
+                 ExecuteSQL(sql_statement=lambda data_set=data_set: f"""
+CREATE TABLE {flattened_table_name(data_set)} AS
+{data_set_sql_query(data_set=data_set, human_readable_columns=True, pre_computed_metrics=False,
+                    star_schema=False, personal_data=True, high_cardinality_attributes=True)};
+""",
+                            echo_queries=False)]))
+
+
+def flattened_data_set_query(data_set: DataSet, pre_computed_metrics: bool, personal_data: bool) -> str:
+    """
+    Returns a select statement on the flattened table of a data set that gives the same result as
+    `data_set_sql_query(data_set, human_readable_columns=True, star_schema=False, high_cardinality_attributes=True,
+    pre_computed_metrics=pre_computed_metrics, personal_data=personal_data)`
+    """
+
+    def sql_formula(metric):
+        """Same as the pre-computation of metrics in `mara_schema.sql_generation`, but on the flattened columns"""
+        if isinstance(metric, SimpleMetric):
+            if metric.aggregation in [Aggregation.DISTINCT_COUNT, Aggregation.COUNT]:
+                return f'({quote(metric.name)} IS NOT NULL) ::INTEGER :: SMALLINT'
+            else:
+                return f'COALESCE({quote(metric.name)}, 0)'
+        elif '/' in metric.formula_template:  # avoid divisions by 0
+            return metric.formula_template.format(
+                *[f'(NULLIF({sql_formula(metric)}, 0.0 :: DOUBLE PRECISION))' for metric in metric.parent_metrics])
+        else:
+            return metric.formula_template.format(*[f'({sql_formula(metric)})' for metric in metric.parent_metrics])
+
+    column_definitions = [quote(name)
+                          for attributes in data_set.connected_attributes().values()
+                          for name, attribute in attributes.items()
+                          if personal_data or not attribute.personal_data]
+
+    for name, metric in data_set.metrics.items():
+        if pre_computed_metrics:
+            column_definitions.append(f'{sql_formula(metric)} AS {quote(metric.name)}')
+        elif isinstance(metric, SimpleMetric):
+            column_definitions.append(quote(metric.name))
+
+    return 'SELECT\n    ' + ',\n    '.join(column_definitions) + f'\nFROM {flattened_table_name(data_set)}'
@@ -0,0 +1,80 @@
+import pathlib
+
+from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.pipelines import Pipeline, Task
+from mara_schema.config import data_sets
+
+from app.schema.approximate_distinct_counts import HllRollup, hll_rollups
+from .flatten_data_sets import flattened_table_name, quote
+
+pipeline = Pipeline(
+    id="create_hll_rollups",
+    description="Creates daily rollups with HyperLogLog sketches for approximate distinct counts",
+    base_path=pathlib.Path(__file__).parent,
+    labels={"Schema": 'hll_rollups'})
+
+pipeline.add_initial(
+    Task(
+        id="initialize_schema",
+        description="Recreates the hll_rollups schema",
+        commands=[
+            ExecuteSQL(sql_statement=f"""
+DROP SCHEMA IF EXISTS hll_rollups_next CASCADE;
+CREATE SCHEMA hll_rollups_next;
+""", echo_queries=False)]))
+
+
+def rollup_query(hll_rollup: HllRollup) -> str:
+    group_by_columns = [quote(hll_rollup.date_attribute)] + [quote(name) for name in hll_rollup.dimension_attributes]
+    table = f'hll_rollups_next.{quote(hll_rollup.table_name())}'
+
+    query = f'CREATE TABLE {table} AS\nSELECT\n    ' + ',\n    '.join(group_by_columns)
+    for metric_name in hll_rollup.metric_names:
+        query += f''',
+    coalesce(hll_add_agg(hll_hash_any({quote(metric_name)}), {hll_rollup.log2m})
+             FILTER (WHERE {quote(metric_name)} IS NOT NULL), hll_empty({hll_rollup.log2m})) AS {quote(metric_name)}'''
+    query += f'\nFROM {flattened_table_name(hll_rollup.data_set)}'
+    query += '\nGROUP BY ' + ', '.join([str(i + 1) for i in range(len(group_by_columns))]) + ';\n'
+
+    for metric_name in hll_rollup.metric_names:
+        query += f"""
+COMMENT ON COLUMN {table}.{quote(metric_name)}
+    IS 'HyperLogLog sketch, distinct counts have a standard error of {hll_rollup.relative_error():.1%}';"""
+    query += f'\n\nANALYZE {table};\n'
+    return query
+
+
+def distinct_counts_table_name(hll_rollup: HllRollup) -> str:
+    """The name of the table with the distinct counts of a rollup in Metabase"""
+    return f'{hll_rollup.data_set.name} (approximate distinct counts)'
+
+
+def distinct_counts_query(hll_rollup: HllRollup) -> str:
+    """
+    The distinct counts of the metrics of a rollup per day, week and month (and dimension values),
+    computed by merging the daily sketches instead of counting distinct values in the flattened data set
+    """
+    dimension_columns = [quote(name) for name in hll_rollup.dimension_attributes]
+    query = f'''SELECT
+    initcap(period) AS "Period",
+    date_trunc(period, {quote(hll_rollup.date_attribute)})::DATE AS {quote(hll_rollup.date_attribute)}'''
+    for column in dimension_columns:
+        query += f',\n    {column}'
+    for metric_name in hll_rollup.metric_names:
+        query += f',\n    round(hll_cardinality(hll_union_agg({quote(metric_name)})))::BIGINT AS {quote(metric_name)}'
+    query += f'''
+FROM hll_rollups_next.{quote(hll_rollup.table_name())}
+  CROSS JOIN unnest(ARRAY ['day', 'week', 'month']) period
+GROUP BY ''' + ', '.join([str(i + 1) for i in range(len(dimension_columns) + 2)])
+    return query
+
+
+for data_set in data_sets():
+    if data_set.id() in hll_rollups:
+        pipeline.add(
+            Task(id=f"create_{data_set.id()}_hll_rollup",
+                 description=f'Aggregates the distinct count metrics of the "{data_set.name}" data set '
+                             f'into daily HyperLogLog sketches',
+                 commands=[
+                     ExecuteSQL(sql_statement=lambda data_set=data_set: rollup_query(hll_rollups[data_set.id()]),
+                                echo_queries=False)]))
@@ -4,10 +4,12 @@ from etl_tools.create_attributes_table import CreateAttributesTable
 from mara_pipelines.commands.python import RunFunction
 from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
-from mara_schema.sql_generation import data_set_sql_query, database_identifier
+from mara_schema.sql_generation import database_identifier
 from mara_schema.config import data_sets
 
-from .cstore_tables import create_cstore_table_for_query
+from .flatten_data_sets import flattened_data_set_query
+from .storage_formats import create_table_for_query, date_column, finalize_table
+from .. import config
 
 pipeline = Pipeline(
     id="flatten_data_sets_for_data_explorer",
@@ -27,13 +29,19 @@ CREATE SCHEMA data_sets_next;
 
 for data_set in data_sets():
     def query(data_set):
-        return data_set_sql_query(
-            data_set=data_set, human_readable_columns=True, pre_computed_metrics=True, star_schema=False,
-            personal_data=True, high_cardinality_attributes=True)
+        return flattened_data_set_query(data_set, pre_computed_metrics=True, personal_data=True)
 
 
-    def create_cstore_table(data_set):
-        return create_cstore_table_for_query(query(data_set), 'data_sets_next', data_set.id(), 'dwh')
+    def create_table(data_set):
+        return create_table_for_query(query(data_set), 'data_sets_next', data_set.id(), 'dwh',
+                                      storage_format=config.data_set_storage_format('data_explorer', data_set.id()),
+                                      date_column=date_column(data_set))
+
+
+    def finalize(data_set):
+        return finalize_table('data_sets_next', data_set.id(), 'dwh',
+                              storage_format=config.data_set_storage_format('data_explorer', data_set.id()),
+                              date_column=date_column(data_set))
 
 
     task_id = f"flatten_{data_set.id()}_for_data_explorer"
@@ -42,12 +50,13 @@ for data_set in data_sets():
         Task(id=task_id,
              description=f'Flattens the "{data_set.name}" data set for best use in the Mara data explorer',
              commands=[
-                 RunFunction(function=create_cstore_table, args=[data_set]),
+                 RunFunction(function=create_table, args=[data_set]),
                  ExecuteSQL(sql_statement=lambda data_set=data_set: f"""
 INSERT INTO data_sets_next."{database_identifier(data_set.name)}"
 {query(data_set)};
 """,
-                            echo_queries=False)]))
+                            echo_queries=False),
+                 RunFunction(function=finalize, args=[data_set])]))
 
     pipeline.add(
         CreateAttributesTable(
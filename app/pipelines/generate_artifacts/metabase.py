@@ -4,10 +4,12 @@ from mara_pipelines.commands.python import RunFunction
 from mara_pipelines.commands.sql import ExecuteSQL, Copy
 from mara_pipelines.pipelines import Pipeline, Task
 from mara_schema.config import data_sets
-from mara_schema.sql_generation import data_set_sql_query
 
-from .cstore_tables import create_cstore_table_for_query
-from .. import initialize_db
+from app.schema.approximate_distinct_counts import hll_rollups
+from .flatten_data_sets import flattened_data_set_query
+from .hll_rollups import distinct_counts_query, distinct_counts_table_name
+from .storage_formats import create_table_for_query, date_column, finalize_table
+from .. import config, initialize_db
 
 pipeline = Pipeline(
     id="flatten_data_sets_for_metabase",
@@ -38,23 +40,57 @@ CREATE SCHEMA metabase_next;
 
 for data_set in data_sets():
     def query(data_set):
-        return data_set_sql_query(data_set=data_set, human_readable_columns=True, pre_computed_metrics=False,
-                                  star_schema=False, personal_data=False,
-                                  high_cardinality_attributes=True)
+        return flattened_data_set_query(data_set, pre_computed_metrics=False, personal_data=False)
 
 
-    def create_cstore_table(data_set):
-        return create_cstore_table_for_query(query(data_set), 'metabase_next', data_set.name, 'metabase-data-write')
+    def create_table(data_set):
+        return create_table_for_query(query(data_set), 'metabase_next', data_set.name, 'metabase-data-write',
+                                      storage_format=config.data_set_storage_format('metabase', data_set.id()),
+                                      date_column=date_column(data_set))
+
+
+    def finalize(data_set):
+        return finalize_table('metabase_next', data_set.name, 'metabase-data-write',
+                              storage_format=config.data_set_storage_format('metabase', data_set.id()),
+                              date_column=date_column(data_set))
 
 
     pipeline.add(
         Task(id=f"flatten_{data_set.id()}_for_metabase",
              description=f'Flattens the "{data_set.name}" data set for best use in Metabase',
              commands=[
-                 RunFunction(function=create_cstore_table, args=[data_set]),
+                 RunFunction(function=create_table, args=[data_set]),
                  Copy(sql_statement=lambda data_set=data_set: f"""
 {query(data_set)};
 """,
                       source_db_alias='dwh',
                       target_table=f'metabase_next."{data_set.name}"',
-                      target_db_alias='metabase-data-write')]))
+                      target_db_alias='metabase-data-write'),
+                 RunFunction(function=finalize, args=[data_set])]))
+
+# distinct counts from the HyperLogLog sketches of the data sets with a rollup (see `add_hll_rollup`)
+for hll_rollup in hll_rollups.values():
+    def create_distinct_counts_table(hll_rollup):
+        return create_table_for_query(distinct_counts_query(hll_rollup), 'metabase_next',
+                                      distinct_counts_table_name(hll_rollup), 'metabase-data-write',
+                                      storage_format='heap')
+
+
+    def finalize_distinct_counts_table(hll_rollup):
+        return finalize_table('metabase_next', distinct_counts_table_name(hll_rollup), 'metabase-data-write',
+                              storage_format='heap')
+
+
+    pipeline.add(
+        Task(id=f"create_{hll_rollup.data_set.id()}_distinct_counts_for_metabase",
+             description=f'Copies the approximate distinct counts per day, week and month of the '
+                         f'"{hll_rollup.data_set.name}" data set to Metabase',
+             commands=[
+                 RunFunction(function=create_distinct_counts_table, args=[hll_rollup]),
+                 Copy(sql_statement=lambda hll_rollup=hll_rollup: f"""
+{distinct_counts_query(hll_rollup)};
+""",
+                      source_db_alias='dwh',
+                      target_table=f'metabase_next."{distinct_counts_table_name(hll_rollup)}"',
+                      target_db_alias='metabase-data-write'),
+                 RunFunction(function=finalize_distinct_counts_table, args=[hll_rollup])]))
@@ -1,10 +1,16 @@
 import pathlib
 
+from mara_pipelines.commands.python import RunFunction
 from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 from mara_schema.sql_generation import data_set_sql_query, database_identifier
 from mara_schema.config import data_sets
 
+from app.schema.mondrian_aggregates import mondrian_aggregates
+from .mondrian_aggregates import aggregate_table_query
+from .storage_formats import create_table_for_query, date_column, finalize_table
+from .. import config
+
 pipeline = Pipeline(
     id="flatten_data_sets_for_mondrian",
     description="Creates data set tables for Mondrian (star schema, without composed metrics, without personal data)",
@@ -22,13 +28,43 @@ CREATE SCHEMA mondrian_next;
 """, echo_queries=False)]))
 
 for data_set in data_sets():
+    def query(data_set):
+        return data_set_sql_query(data_set=data_set, pre_computed_metrics=False, human_readable_columns=False,
+                                  star_schema=True, personal_data=False, high_cardinality_attributes=False)
+
+
+    def create_table(data_set):
+        return create_table_for_query(query(data_set), 'mondrian_next', database_identifier(data_set.name), 'dwh',
+                                      storage_format=config.data_set_storage_format('mondrian', data_set.id()),
+                                      date_column=date_column(data_set, human_readable_columns=False,
+                                                              star_schema=True))
+
+
+    def finalize(data_set):
+        return finalize_table('mondrian_next', database_identifier(data_set.name), 'dwh',
+                              storage_format=config.data_set_storage_format('mondrian', data_set.id()),
+                              date_column=date_column(data_set, human_readable_columns=False, star_schema=True))
+
+
     pipeline.add(
         Task(id=f"flatten_{data_set.id()}_for_mondrian",
              description=f'Flattens the "{data_set.name}" data set for best use in Mondrian',
              commands=[
-                 ExecuteSQL(f"""
-CREATE TABLE mondrian_next.{database_identifier(data_set.name)} AS
-{data_set_sql_query(data_set=data_set, pre_computed_metrics=False, human_readable_columns=False, star_schema=True,
-                    personal_data=False, high_cardinality_attributes=False)};
+                 RunFunction(function=create_table, args=[data_set]),
+                 ExecuteSQL(sql_statement=lambda data_set=data_set: f"""
+INSERT INTO mondrian_next.{database_identifier(data_set.name)}
+{query(data_set)};
 """,
-                            echo_queries=False)]))
+                            echo_queries=False),
+                 RunFunction(function=finalize, args=[data_set])]))
+
+    if data_set.id() in mondrian_aggregates:
+        pipeline.add(
+            Task(id=f"create_{data_set.id()}_aggregates_for_mondrian",
+                 description=f'Creates the Mondrian aggregate tables of the "{data_set.name}" data set',
+                 commands=[
+                     ExecuteSQL(sql_statement=lambda data_set=data_set: '\n'.join(
+                         [aggregate_table_query(aggregate, 'mondrian_next', database_identifier(data_set.name))
+                          for aggregate in mondrian_aggregates[data_set.id()]]),
+                                echo_queries=False)]),
+            upstreams=[f"flatten_{data_set.id()}_for_mondrian"])
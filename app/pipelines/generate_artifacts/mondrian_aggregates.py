@@ -0,0 +1,87 @@
+"""Creation of Mondrian aggregate tables and their declaration in the Mondrian schema"""
+
+from lxml import etree
+from mara_schema.attribute import Type
+from mara_schema.metric import Aggregation, SimpleMetric
+from mara_schema.sql_generation import database_identifier, foreign_key_column_name, table_alias_for_path
+
+from app.schema.mondrian_aggregates import MondrianAggregate, date_levels
+
+
+def _attribute_path(aggregate: MondrianAggregate, name: str):
+    for path, attributes in aggregate.data_set.connected_attributes().items():
+        if name in attributes:
+            return path, attributes[name]
+
+
+def aggregated_metrics(aggregate: MondrianAggregate) -> [SimpleMetric]:
+    """
+    The metrics of an aggregate table. Averages are left out, as they can not be rolled up to higher levels.
+    Distinct counts are only used by Mondrian when a query is on exactly the levels of the aggregate table.
+    """
+    return [metric for metric in aggregate.data_set.metrics.values()
+            if isinstance(metric, SimpleMetric) and metric.aggregation != Aggregation.AVERAGE]
+
+
+def aggregate_table_query(aggregate: MondrianAggregate, schema_name: str, fact_table_name: str) -> str:
+    """The sql for creating an aggregate table from the fact table of a data set"""
+    columns = []
+    joins = []
+
+    if aggregate.date_attribute:
+        date_fk_column = foreign_key_column_name(database_identifier(aggregate.date_attribute))
+        joins.append(f'LEFT JOIN time.day ON fact.{date_fk_column} = day.day_id')
+        for level in date_levels[:date_levels.index(aggregate.date_level) + 1]:
+            columns.append(f'day.{level.lower()}_id')
+
+    for name in aggregate.attributes:
+        path, attribute = _attribute_path(aggregate, name)
+        if not path:
+            expression = f'fact.{database_identifier(name)}'
+        else:
+            # the same join as in the dimension of the attribute in the Mondrian schema
+            alias = table_alias_for_path(path)
+            entity = path[-1].target_entity
+            joins.append(f'LEFT JOIN {entity.schema_name}.{entity.table_name} {alias} '
+                         f'ON fact.{foreign_key_column_name(alias)} = {alias}.{entity.pk_column_name}')
+            expression = f'{alias}.{attribute.column_name}'
+        if attribute.type == Type.ENUM:
+            expression += '::TEXT'
+        columns.append(f'{expression} AS {database_identifier(name)}')
+
+    group_by = ', '.join([str(i + 1) for i in range(len(columns))])
+
+    for metric in aggregated_metrics(aggregate):
+        column = database_identifier(metric.name)
+        if metric.aggregation == Aggregation.DISTINCT_COUNT:
+            columns.append(f'count(DISTINCT fact.{column}) AS {column}')
+        else:
+            columns.append(f'{metric.aggregation}(fact.{column}) AS {column}')
+    columns.append('count(*) AS fact_count')
+
+    return f"""
+CREATE TABLE {schema_name}.{aggregate.table_name()} AS
+SELECT
+    """ + ',\n    '.join(columns) + f"""
+FROM {schema_name}.{fact_table_name} fact
+""" + '\n'.join(joins) + (f'\nGROUP BY {group_by}' if group_by else '') + ';\n'
+
+
+def aggregate_xml(aggregate: MondrianAggregate) -> etree.Element:
+    """The declaration of an aggregate table for the `Table` element of a cube"""
+    agg_name = etree.Element('AggName', name=aggregate.table_name())
+    etree.SubElement(agg_name, 'AggFactCount', column='fact_count')
+
+    for metric in aggregated_metrics(aggregate):
+        etree.SubElement(agg_name, 'AggMeasure', name=f'[Measures].[{metric.name}]',
+                         column=database_identifier(metric.name))
+
+    if aggregate.date_attribute:
+        for level in date_levels[:date_levels.index(aggregate.date_level) + 1]:
+            etree.SubElement(agg_name, 'AggLevel', name=f'[{aggregate.date_attribute}.By month].[{level}]',
+                             column=f'{level.lower()}_id')
+
+    for name in aggregate.attributes:
+        etree.SubElement(agg_name, 'AggLevel', name=f'[{name}].[{name}]', column=database_identifier(name))
+
+    return agg_name
@@ -0,0 +1,105 @@
+"""Storage formats for the data set tables of the front-ends"""
+
+import datetime
+
+from mara_pipelines.logging import logger
+from mara_schema.attribute import Type
+from mara_schema.data_set import DataSet
+from mara_schema.sql_generation import database_identifier, foreign_key_column_name
+
+from app.connection_pool import connection_context
+from .cstore_tables import column_definitions, create_cstore_table_for_query
+from .. import config
+
+storage_formats = ['heap', 'heap_brin', 'cstore_pglz', 'cstore_none', 'partitioned_heap']
+"""
+- heap: a normal table
+- heap_brin: a normal table with a BRIN index on the date column
+- cstore_pglz: a cstore_fdw foreign table with pglz compression
+- cstore_none: an uncompressed cstore_fdw foreign table
+- partitioned_heap: a table that is partitioned by year on the date column
+"""
+
+
+def date_column(data_set: DataSet, human_readable_columns: bool = True, star_schema: bool = False) -> str:
+    """
+    The name of the column of the first date attribute of a data set (e.g. "Order date"), which is used for
+    BRIN indexes and partitioning. Attributes that are not in all front-ends (personal data, high cardinality) are
+    ignored. Returns None when the data set has no such date attribute.
+    """
+    for attributes in data_set.connected_attributes().values():
+        for name, attribute in attributes.items():
+            if attribute.type == Type.DATE and not attribute.personal_data and not attribute.high_cardinality:
+                if human_readable_columns:
+                    return name
+                elif star_schema:
+                    return foreign_key_column_name(database_identifier(name))
+                else:
+                    return database_identifier(name)
+
+
+def _execute(ddl: str, db_alias: str):
+    logger.log(ddl, format=logger.Format.VERBATIM)
+    with connection_context(db_alias) as connection, connection.cursor() as cursor:
+        connection.autocommit = True
+        cursor.execute(ddl)
+
+
+def create_table_for_query(sql_select_statement: str, database_schema: str, table_name: str, db_alias: str,
+                           storage_format: str, date_column: str = None, source_db_alias: str = 'dwh') -> bool:
+    """
+    Creates an empty table that can take the output of a select statement
+
+    Args:
+        sql_select_statement: The query whose result is later inserted into the table
+        database_schema: The schema of the table
+        table_name: The name of the table
+        db_alias: The database in which the table is created
+        storage_format: One of `storage_formats`
+        date_column: The column for BRIN indexes and partitions. Without it, 'heap_brin' and
+                     'partitioned_heap' fall back to 'heap'.
+        source_db_alias: The database in which the select statement runs
+    """
+    assert storage_format in storage_formats, f'Unknown storage format "{storage_format}"'
+
+    if storage_format in ['cstore_pglz', 'cstore_none']:
+        return create_cstore_table_for_query(sql_select_statement, database_schema, table_name, db_alias,
+                                             source_db_alias=source_db_alias,
+                                             compression=storage_format.replace('cstore_', ''))
+
+    columns = column_definitions(sql_select_statement, source_db_alias)
+
+    ddl = f"""
+CREATE TABLE "{database_schema}"."{table_name}" (
+    """
+    ddl += ',\n    '.join([f'"{column_name}" {column_type}' for column_name, column_type in columns])
+    ddl += '\n)'
+
+    if storage_format == 'partitioned_heap' and date_column:
+        # yearly partitions, rows outside of the configured time range go into the default partition
+        column_type = dict(columns)[date_column]
+        ddl += f' PARTITION BY RANGE ("{date_column}");\n'
+        for year in range(config.first_date().year, datetime.date.today().year + 2):
+            bounds = [f"'{year}-01-01'" if column_type == 'date' else f'{year}0101',
+                      f"'{year + 1}-01-01'" if column_type == 'date' else f'{year + 1}0101']
+            ddl += f"""
+CREATE TABLE "{database_schema}"."{table_name}_{year}" PARTITION OF "{database_schema}"."{table_name}"
+    FOR VALUES FROM ({bounds[0]}) TO ({bounds[1]});"""
+        ddl += f"""
+CREATE TABLE "{database_schema}"."{table_name}_default" PARTITION OF "{database_schema}"."{table_name}" DEFAULT;"""
+    else:
+        ddl += ';'
+
+    _execute(ddl, db_alias)
+    return True
+
+
+def finalize_table(database_schema: str, table_name: str, db_alias: str, storage_format: str,
+                   date_column: str = None) -> bool:
+    """Creates indexes and statistics after a table was filled"""
+    ddl = ''
+    if storage_format == 'heap_brin' and date_column:
+        ddl += f'CREATE INDEX ON "{database_schema}"."{table_name}" USING BRIN ("{date_column}");\n'
+    ddl += f'ANALYZE "{database_schema}"."{table_name}";'
+    _execute(ddl, db_alias)
+    return True
@@ -19,3 +19,18 @@ pipeline.add(
              ExecuteSQL(sql_file_name='create_read_only_user.sql')
          ]),
     upstreams=['initialize_utils'])
+
+pipeline.add(
+    Task(id='create_constraint_functions',
+         description='Creates functions for adding foreign keys without validation and for validating them later',
+         commands=[
+             ExecuteSQL(sql_file_name='create_constraint_functions.sql')
+         ]),
+    upstreams=['initialize_utils'])
+
+pipeline.add(
+    Task(id='initialize_hll',
+         description='Enables the postgresql-hll extension for approximate distinct counts',
+         commands=[
+             ExecuteSQL(sql_statement='CREATE EXTENSION IF NOT EXISTS hll;')
+         ]))
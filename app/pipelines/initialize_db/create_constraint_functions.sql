@@ -0,0 +1,50 @@
+-- adds a foreign key without checking the existing rows, e.g.
+-- SELECT util.add_fk_not_valid('ec_dim_next', 'order', 'ec_dim_next', 'customer');
+-- Partitioned tables do not support NOT VALID foreign keys, their rows are checked right away
+CREATE OR REPLACE FUNCTION util.add_fk_not_valid(schemaname TEXT, tablename TEXT, fk_column TEXT,
+                                                 reftable_schemaname TEXT, reftablename TEXT)
+    RETURNS VOID AS
+$$
+BEGIN
+    EXECUTE 'ALTER TABLE ' || quote_ident(schemaname) || '.' || quote_ident(tablename)
+                || ' ADD FOREIGN KEY (' || quote_ident(fk_column) || ')'
+                || ' REFERENCES ' || quote_ident(reftable_schemaname) || '.' || quote_ident(reftablename)
+                || CASE
+                       WHEN (SELECT relkind
+                             FROM pg_class
+                             WHERE oid = (quote_ident(schemaname) || '.' || quote_ident(tablename))::REGCLASS) = 'p'
+                           THEN ''
+                       ELSE ' NOT VALID' END;
+END
+$$
+    LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION util.add_fk_not_valid(schemaname TEXT, tablename TEXT,
+                                                 reftable_schemaname TEXT, reftablename TEXT)
+    RETURNS VOID AS
+$$
+SELECT util.add_fk_not_valid(schemaname, tablename, reftablename || '_fk', reftable_schemaname, reftablename);
+$$
+    LANGUAGE sql;
+
+
+-- checks the existing rows for all not yet validated constraints of a table.
+-- Validation only takes a SHARE UPDATE EXCLUSIVE lock on the table (and a ROW SHARE lock on referenced tables),
+-- so that different tables can be validated at the same time
+CREATE OR REPLACE FUNCTION util.validate_constraints(schemaname TEXT, tablename TEXT)
+    RETURNS VOID AS
+$$
+DECLARE
+    constraint_name TEXT;
+BEGIN
+    FOR constraint_name IN SELECT conname
+                           FROM pg_constraint
+                           WHERE conrelid = (quote_ident(schemaname) || '.' || quote_ident(tablename))::REGCLASS
+                             AND NOT convalidated
+        LOOP
+            EXECUTE 'ALTER TABLE ' || quote_ident(schemaname) || '.' || quote_ident(tablename)
+                        || ' VALIDATE CONSTRAINT ' || quote_ident(constraint_name);
+        END LOOP;
+END
+$$
+    LANGUAGE plpgsql;
@@ -0,0 +1,90 @@
+"""Copies data between two PostgreSQL databases in the binary COPY format (without a text round-trip)"""
+
+import mara_db.dbs
+import mara_db.postgresql
+import mara_db.shell
+from mara_page import _
+from mara_pipelines import shell
+from mara_pipelines.commands.sql import _SQLCommand, Copy, CopyIncrementally
+
+
+def target_table_columns(db_alias: str, target_table: str) -> [(str, str)]:
+    """Returns the names and types of the columns of a table, in the order of the table definition"""
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        cursor.execute('''
+SELECT attname, format_type(atttypid, atttypmod)
+FROM pg_attribute
+WHERE attrelid = %s::REGCLASS AND attnum > 0 AND NOT attisdropped
+ORDER BY attnum''', (target_table,))
+        return cursor.fetchall()
+
+
+def binary_copy_command(source_db_alias: str, target_db_alias: str, target_table: str,
+                        timezone: str = None) -> str:
+    """
+    Creates a shell command that receives a query from stdin, runs it in the source db and
+    streams the result in the binary COPY format into a table in the target db.
+
+    The binary format requires the exact same column types on both sides, therefore the
+    result columns of the query are cast (positionally) to the column types of the target table.
+    """
+    for alias in [source_db_alias, target_db_alias]:
+        assert isinstance(mara_db.dbs.db(alias), mara_db.dbs.PostgreSQLDB), \
+            f'Binary copy is only supported between PostgreSQL databases, got "{alias}"'
+
+    columns = target_table_columns(target_db_alias, target_table)
+    column_names = ', '.join([f'"{column_name}"' for column_name, column_type in columns])
+    casts = ', '.join([f'src."{column_name}"::{column_type}' for column_name, column_type in columns])
+
+    # double quotes need to be escaped in the shell command
+    copy_to_stdout_before = f'COPY (SELECT {casts} FROM ('.replace('"', '\\"')
+    copy_to_stdout_after = f') src ({column_names})) TO STDOUT (FORMAT binary)'.replace('"', '\\"')
+    copy_from_stdin = f'COPY {target_table} ({column_names}) FROM STDIN (FORMAT binary)'.replace('"', '\\"')
+
+    return (r"sed 's/\;[[:space:]]*$//' " + '\\\n'  # remove trailing semicolons
+            + f'  | (echo "{copy_to_stdout_before}" && cat && echo "{copy_to_stdout_after}") \\\n'
+            + '  | ' + mara_db.shell.query_command(source_db_alias, timezone=timezone, echo_queries=False)
+            + ' --quiet \\\n'
+            + '  | ' + mara_db.shell.query_command(target_db_alias, timezone=timezone, echo_queries=False)
+            + f' \\\n      --command="{copy_from_stdin}"')
+
+
+class BinaryCopy(Copy):
+    """Loads data from another PostgreSQL database using the binary COPY format"""
+
+    def shell_command(self):
+        return _SQLCommand.shell_command(self) \
+               + '  | ' + binary_copy_command(self.source_db_alias, self.target_db_alias,
+                                              self.target_table, self.timezone)
+
+    def html_doc_items(self) -> [(str, str)]:
+        # the shell command can only be created at run time, because it depends on the target table columns
+        return [('source db', _.tt[self.source_db_alias])] \
+               + _SQLCommand.html_doc_items(self, self.source_db_alias) \
+               + [('target db', _.tt[self.target_db_alias]),
+                  ('target table', _.tt[self.target_table]),
+                  ('timezone', _.tt[self.timezone or '']),
+                  ('format', _.tt['binary'])]
+
+
+class BinaryCopyIncrementally(CopyIncrementally):
+    """Incrementally loads data from another PostgreSQL database using the binary COPY format"""
+
+    @property
+    def source_table(self) -> str:
+        # can be a callable, e.g. for switching between source schemas at run time
+        return self._source_table() if callable(self._source_table) else self._source_table
+
+    @source_table.setter
+    def source_table(self, source_table):
+        self._source_table = source_table
+
+    def _copy_command(self, target_table, replace):
+        return (_SQLCommand.shell_command(self)
+                + '  | ' + shell.sed_command(replace)
+                + '  | ' + binary_copy_command(self.source_db_alias, self.target_db_alias,
+                                               target_table, timezone=self.timezone))
+
+    def html_doc_items(self) -> [(str, str)]:
+        return [item for item in super().html_doc_items() if item[0] not in ['csv format', 'delimiter char']] \
+               + [('format', _.tt['binary'])]
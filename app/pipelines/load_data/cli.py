@@ -0,0 +1,69 @@
+"""Command line interface for benchmarking the data transfer from the backend database"""
+
+import shlex
+import time
+
+import click
+import mara_db.postgresql
+import mara_db.shell
+from mara_pipelines import shell
+
+from app.pipelines.load_data.binary_copy import binary_copy_command
+
+# source queries of the text (';'-delimited) copy as it was used before the binary transport
+benchmark_queries = {
+    'ec_data.geolocation': ("""
+SELECT geolocation_zip_code_prefix,
+       geolocation_lat,
+       geolocation_lng,
+       regexp_replace(geolocation_city, ';', '.'),
+       geolocation_state
+FROM ecommerce.geolocation""", """
+SELECT geolocation_zip_code_prefix,
+       geolocation_lat,
+       geolocation_lng,
+       geolocation_city,
+       geolocation_state
+FROM ecommerce.geolocation"""),
+    'ec_data.order_item': ('SELECT * FROM ecommerce.order_items', 'SELECT * FROM ecommerce.order_items')
+}
+
+
+@click.command()
+@click.option('--source-db-alias', default='olist', help='The database to copy from. Default: "olist".')
+@click.option('--target-db-alias', default='dwh', help='The database to copy into. Default: "dwh".')
+@click.option('--repetitions', default=3, help='How often to copy each table with each transport. Default: 3.')
+def benchmark_copy(source_db_alias: str, target_db_alias: str, repetitions: int):
+    """Compares the text (';'-delimited) and the binary copy transport on the geolocation and order_item tables"""
+    for target_table, (text_query, binary_query) in benchmark_queries.items():
+        benchmark_table = target_table + '_copy_benchmark'
+        with mara_db.postgresql.postgres_cursor_context(target_db_alias) as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {benchmark_table}; '
+                           f'CREATE TABLE {benchmark_table} (LIKE {target_table})')
+
+        transports = {
+            'text': f'echo {shlex.quote(text_query)} \\\n  | '
+                    + mara_db.shell.copy_command(source_db_alias, target_db_alias, benchmark_table,
+                                                 delimiter_char=';'),
+            'binary': f'echo {shlex.quote(binary_query)} \\\n  | '
+                      + binary_copy_command(source_db_alias, target_db_alias, benchmark_table)}
+
+        for transport, command in transports.items():
+            durations = []
+            for _ in range(repetitions):
+                with mara_db.postgresql.postgres_cursor_context(target_db_alias) as cursor:
+                    cursor.execute(f'TRUNCATE {benchmark_table}')
+                start_time = time.time()
+                if not shell.run_shell_command(command, log_command=False):
+                    raise click.ClickException(f'Copying {target_table} with the {transport} transport failed')
+                durations.append(time.time() - start_time)
+
+            with mara_db.postgresql.postgres_cursor_context(target_db_alias) as cursor:
+                cursor.execute(f'SELECT count(*) FROM {benchmark_table}')
+                number_of_rows = cursor.fetchone()[0]
+
+            print(f'{target_table:<20} {transport:<7} {number_of_rows:>10} rows  '
+                  f'min {min(durations):7.2f}s  avg {sum(durations) / len(durations):7.2f}s')
+
+        with mara_db.postgresql.postgres_cursor_context(target_db_alias) as cursor:
+            cursor.execute(f'DROP TABLE {benchmark_table}')
@@ -1,8 +1,14 @@
 import pathlib
 
-from mara_pipelines.commands.sql import ExecuteSQL, Copy
+from mara_pipelines.commands.python import RunFunction
+from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 
+from app.pipelines import config
+from app.pipelines.date_window import date_filter, date_window_changed, store_date_window
+from app.pipelines.load_data.binary_copy import BinaryCopy, BinaryCopyIncrementally
+from app.pipelines.load_data.parallel_copy import ParallelCopy
+
 pipeline = Pipeline(
     id="load_ecommerce_data",
     description="Jobs related with loading e-commerce data from the backend database",
@@ -11,16 +17,15 @@ pipeline = Pipeline(
     labels={"Schema": "ec_data"})
 
 pipeline.add_initial(
-    Task(id="initialize_schemas", description="Recreates the e-commerce data schema",
+    Task(id="initialize_schemas",
+         description="Creates (or on a full refresh or for other processed days recreates) the e-commerce data schema",
          commands=[
              ExecuteSQL(sql_file_name='../recreate_ecommerce_data_schema.sql',
-                        file_dependencies=[
-                            pathlib.Path(__file__).parent.parent / 'recreate_ecommerce_data_schema.sql'])]))
+                        replace={'@full_refresh@': lambda: ('TRUE' if config.full_refresh()
+                                                                      or date_window_changed('ec_data') else 'FALSE')}),
+             RunFunction(function=store_date_window, args=['ec_data'])]))
 
 tables = [
-    'customer',
-    'order',
-    'order_item',
     'product',
     'product_category_name_translation',
     'seller'
@@ -34,25 +39,90 @@ for table in tables:
 
                  ExecuteSQL(sql_file_name=f'{table}/create_{table}_table.sql'),
 
-                 Copy(sql_statement=f"""
+                 BinaryCopy(sql_statement=lambda table=table: f"""
+                 SELECT *
+                 FROM {config.ecommerce_source_schema()}.{table}s;
+""",
+                            source_db_alias='olist',
+                            target_db_alias='dwh',
+                            target_table=f'ec_data.{table}')]
+             )
+    )
+
+# Tables that are only copied when new or changed in the source. The watermark is the highest value of
+# the modification comparison that was loaded last time (stored in the mara db per task).
+# The source has no modification timestamp for order items: changes of an item that do not move its
+# shipping_limit_date (e.g. a corrected price) are only loaded with a full refresh.
+incrementally_loaded_tables = {
+    'order': (['order_id'],
+              'greatest(order_purchase_timestamp, order_approved_at, '
+              'order_delivered_carrier_date, order_delivered_customer_date)'),
+    'order_item': (['order_id', 'order_item_id'], 'shipping_limit_date')
+}
+
+
+def orders_in_date_window(column: str) -> str:
+    """A sub query for a column (e.g. the id) of the orders that were placed within the processed days"""
+    return f"SELECT {column} FROM {config.ecommerce_source_schema()}.orders " \
+           f"WHERE {date_filter('order_purchase_timestamp')}"
+
+
+# Only orders within the processed days are copied, together with their items and customers
+date_window_conditions = {
+    'order': lambda: date_filter('order_purchase_timestamp'),
+    'order_item': lambda: f"order_id IN ({orders_in_date_window('order_id')})"
+}
+
+for table, (primary_keys, modification_comparison) in incrementally_loaded_tables.items():
+    pipeline.add(
+        Task(id=f"load_{table}",
+             description=f'Loads new or changed {table}s from the backend database',
+             commands=[
+
+                 ExecuteSQL(sql_file_name=f'{table}/create_{table}_table.sql'),
+
+                 BinaryCopyIncrementally(sql_statement=lambda table=table: f"""
                  SELECT *
-                 FROM ecommerce.{table}s;
+                 FROM {config.ecommerce_source_schema()}.{table}s
+                 WHERE @modification_comparison@
+                   AND {date_window_conditions[table]()};
 """,
-                      source_db_alias='olist',
-                      target_db_alias='dwh',
-                      target_table=f'ec_data.{table}',
-                      delimiter_char=';')]
+                                         source_db_alias='olist',
+                                         source_table=lambda table=table: f'{config.ecommerce_source_schema()}.{table}s',
+                                         modification_comparison=modification_comparison,
+                                         comparison_value_placeholder='@modification_comparison@',
+                                         target_db_alias='dwh',
+                                         target_table=f'ec_data.{table}',
+                                         primary_keys=primary_keys)]
              )
     )
 
+# Large tables are split into hash partitions of their key and copied in parallel
+pipeline.add(
+    ParallelCopy(
+        id="load_customer",
+        description='Loads the customers from the backend database',
+        commands_before=[ExecuteSQL(sql_file_name='customer/create_customer_table.sql')],
+        sql_statement=lambda: f"""
+        SELECT *
+        FROM {config.ecommerce_source_schema()}.customers
+        WHERE @chunk@
+          AND customer_id IN ({orders_in_date_window('customer_id')});
+""",
+        chunk_key='customer_id',
+        source_db_alias='olist',
+        target_db_alias='dwh',
+        target_table='ec_data.customer'))
+
 pipeline.add(
-    Task(
+    ParallelCopy(
         id="load_geolocation_data",
         description="Loads geolocation data from the backend DB, "
                     "containing information Brazilian zip codes and its lat/lng coordinates",
-        commands=[
-            ExecuteSQL(sql_file_name='geolocation/create_geolocation_table.sql'),
-            Copy(sql_file_name='geolocation/load_geolocation.sql', source_db_alias='olist',
-                 target_db_alias='dwh', target_table='ec_data.geolocation',
-                 delimiter_char=';')
-        ]))
+        commands_before=[ExecuteSQL(sql_file_name='geolocation/create_geolocation_table.sql')],
+        sql_file_name='geolocation/load_geolocation.sql',
+        replace={'@ecommerce_source_schema@': lambda: config.ecommerce_source_schema()},
+        chunk_key='geolocation_zip_code_prefix',
+        source_db_alias='olist',
+        target_db_alias='dwh',
+        target_table='ec_data.geolocation'))
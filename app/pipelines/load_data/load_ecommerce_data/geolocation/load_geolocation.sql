@@ -1,6 +1,7 @@
 SELECT geolocation_zip_code_prefix,
        geolocation_lat,
        geolocation_lng,
-       regexp_replace(geolocation_city, ';', '.'), --replace ';' with '.' (';' used as delimiter)
+       geolocation_city,
        geolocation_state
-FROM ecommerce.geolocation
\ No newline at end of file
+FROM @ecommerce_source_schema@.geolocation
+WHERE @chunk@ -- replaced with a hash partition of the zip code (see ParallelCopy)
@@ -1,8 +1,8 @@
 --This is the core table. From each order you might find all other information.
-DROP TABLE IF EXISTS ec_data.order CASCADE;
-CREATE TABLE ec_data.order
+--Loaded incrementally, therefore only (re)created on a full refresh.
+CREATE TABLE IF NOT EXISTS ec_data.order
 (
-    order_id                      TEXT,                     --unique identifier of the order.
+    order_id                      TEXT PRIMARY KEY,         --unique identifier of the order.
     customer_id                   TEXT,                     --key to the customer table. Each order has a unique customer_id.
     order_status                  TEXT,                     --Reference to the order status (delivered, shipped, etc).
     order_purchase_timestamp      TIMESTAMP WITH TIME ZONE,                --Shows the purchase timestamp.
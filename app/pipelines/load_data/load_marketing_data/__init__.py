@@ -1,9 +1,13 @@
 import pathlib
 
-from mara_pipelines.commands.sql import ExecuteSQL, Copy
+from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 from mara_pipelines import config
 
+import app.pipelines.config
+from app.pipelines.date_window import date_filter
+from app.pipelines.load_data.binary_copy import BinaryCopy
+
 pipeline = Pipeline(
     id="load_marketing_data",
     description="Jobs related with loading marketing leads data from the backend database",
@@ -18,6 +22,14 @@ pipeline.add_initial(
                         file_dependencies=[
                             pathlib.Path(__file__).parent.parent / 'recreate_marketing_data_schema.sql'])]))
 
+# Only leads that were first contacted within the processed days are copied, together with their deals
+date_window_conditions = {
+    'closed_deal': lambda: f"mql_id IN (SELECT mql_id "
+                           f"FROM {app.pipelines.config.marketing_source_schema()}.marketing_qualified_leads "
+                           f"WHERE {date_filter('first_contact_date')})",
+    'marketing_qualified_lead': lambda: date_filter('first_contact_date')
+}
+
 tables = [
     'closed_deal',
     'marketing_qualified_lead'
@@ -31,13 +43,13 @@ for table in tables:
 
                  ExecuteSQL(sql_file_name=f'{table}/create_{table}_table.sql'),
 
-                 Copy(sql_statement=f"""
+                 BinaryCopy(sql_statement=lambda table=table: f"""
                  SELECT *
-                 FROM marketing.{table}s;
+                 FROM {app.pipelines.config.marketing_source_schema()}.{table}s
+                 WHERE {date_window_conditions[table]()};
 """,
-                      source_db_alias='olist',
-                      target_db_alias='dwh',
-                      target_table=f'm_data.{table}',
-                      delimiter_char=';')]
+                            source_db_alias='olist',
+                            target_db_alias='dwh',
+                            target_table=f'm_data.{table}')]
              )
     )
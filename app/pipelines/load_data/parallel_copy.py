@@ -0,0 +1,90 @@
+"""Copies large source tables in several concurrent chunks instead of one single stream"""
+
+import typing
+
+import etl_tools.config
+from mara_page import _
+from mara_pipelines import config, pipelines
+from mara_pipelines.commands import sql
+
+from app.pipelines.load_data.binary_copy import BinaryCopy
+
+
+class ParallelCopy(pipelines.ParallelTask, sql._SQLCommand):
+    def __init__(self, id: str, description: str, source_db_alias: str, target_table: str, chunk_key: str,
+                 chunk_placeholder: str = '@chunk@', number_of_chunks: typing.Optional[int] = None,
+                 target_db_alias: str = None, sql_statement: str = None, sql_file_name: str = None,
+                 replace: {str: str} = None, max_number_of_parallel_tasks: int = None,
+                 commands_before: [pipelines.Command] = None, commands_after: [pipelines.Command] = None,
+                 timezone: str = None) -> None:
+        """
+        Splits a source query into hash partitions of a key and copies the partitions concurrently
+        (in the binary COPY format, see `BinaryCopy`).
+
+        Each chunk runs the query with `chunk_placeholder` replaced by a condition like
+        `(abs(hashtext((<chunk_key>)::TEXT)) % <number_of_chunks> = <chunk>)`, so the query needs to contain
+        the placeholder in its WHERE clause (e.g. `WHERE @chunk@`).
+
+        Args:
+            source_db_alias: The database to load from (needs to be PostgreSQL because of `hashtext`)
+            target_table: The table to load into, needs to exist (e.g. created in `commands_before`)
+            chunk_key: The SQL expression that rows are partitioned by (e.g. a primary key column)
+            chunk_placeholder: The placeholder in the query that is replaced with the chunk condition
+            number_of_chunks: Into how many partitions to split the query, defaults to `etl_tools.config.number_of_chunks()`
+            max_number_of_parallel_tasks: How many chunks to copy at the same time, defaults to an equal share
+                                          of the parallel task limit of the parent pipeline among its
+                                          parallel copies (mara applies that limit only to the direct children
+                                          of a pipeline, not to the chunks of each copy)
+        """
+        pipelines.ParallelTask.__init__(self, id=id, description=description,
+                                        max_number_of_parallel_tasks=max_number_of_parallel_tasks,
+                                        commands_before=commands_before, commands_after=commands_after)
+        sql._SQLCommand.__init__(self, sql_statement, sql_file_name, replace)
+
+        self.source_db_alias = source_db_alias
+        self.target_table = target_table
+        self._target_db_alias = target_db_alias
+        self.chunk_key = chunk_key
+        self.chunk_placeholder = chunk_placeholder
+        self._number_of_chunks = number_of_chunks
+        self.timezone = timezone
+
+    @property
+    def target_db_alias(self):
+        return self._target_db_alias or config.default_db_alias()
+
+    @property
+    def number_of_chunks(self) -> int:
+        return self._number_of_chunks or etl_tools.config.number_of_chunks()
+
+    def launch(self) -> 'pipelines.Pipeline':
+        if not self.max_number_of_parallel_tasks:
+            budget = (self.parent.max_number_of_parallel_tasks if self.parent else None) \
+                     or config.max_number_of_parallel_tasks()
+            parallel_copies = [node for node in self.parent.nodes.values() if isinstance(node, ParallelCopy)] \
+                if self.parent else [self]
+            self.max_number_of_parallel_tasks = max(1, budget // len(parallel_copies))
+        return super().launch()
+
+    def add_parallel_tasks(self, sub_pipeline: 'pipelines.Pipeline') -> None:
+        for chunk in range(self.number_of_chunks):
+            replace = self.replace.copy()
+            replace[self.chunk_placeholder] = \
+                f'(abs(hashtext(({self.chunk_key})::TEXT)) % {self.number_of_chunks} = {chunk})'
+
+            sub_pipeline.add(pipelines.Task(
+                id=f'chunk_{chunk}', description=f'Copies chunk {chunk} of {self.number_of_chunks}',
+                commands=[
+                    BinaryCopy(sql_file_name=self.sql_file_name, sql_statement=self.sql_statement,
+                               source_db_alias=self.source_db_alias, target_db_alias=self.target_db_alias,
+                               target_table=self.target_table, replace=replace, timezone=self.timezone)]))
+
+    def html_doc_items(self) -> [(str, str)]:
+        return [('source db', _.tt[self.source_db_alias])] \
+               + sql._SQLCommand.html_doc_items(self, self.source_db_alias) \
+               + [('chunk key', _.tt[self.chunk_key]),
+                  ('chunk placeholder', _.tt[self.chunk_placeholder]),
+                  ('number of chunks', _.tt[str(self.number_of_chunks)]),
+                  ('target db', _.tt[self.target_db_alias]),
+                  ('target table', _.tt[self.target_table]),
+                  ('timezone', _.tt[self.timezone or ''])]
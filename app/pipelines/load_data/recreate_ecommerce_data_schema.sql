@@ -1,4 +1,16 @@
-DROP SCHEMA IF EXISTS ec_data CASCADE;
-CREATE SCHEMA ec_data;
+-- The e-commerce data schema is only dropped on a full refresh (see app.pipelines.config.full_refresh) or when the
+-- processed days changed since the last load (see app.pipelines.date_window.date_window_changed),
+-- otherwise the incrementally loaded tables keep their data and only new or changed rows are upserted
+DO
+$$
+    BEGIN
+        IF @full_refresh@ THEN
+            DROP SCHEMA IF EXISTS ec_data CASCADE;
+        END IF;
 
-SELECT util.create_chunking_functions('ec_data');
\ No newline at end of file
+        IF NOT exists(SELECT 1 FROM pg_namespace WHERE nspname = 'ec_data') THEN
+            CREATE SCHEMA ec_data;
+            PERFORM util.create_chunking_functions('ec_data');
+        END IF;
+    END
+$$;
@@ -0,0 +1,86 @@
+"""Generation of scaled copies of the Olist source data for load testing the pipelines"""
+
+import concurrent.futures
+import time
+
+import click
+import mara_db.postgresql
+
+# Text columns that identify entities. In each replica of the data, their values get the replica number
+# as suffix, so that the relations between the tables stay intact (e.g. customers with multiple orders)
+id_columns = {'order_id', 'customer_id', 'customer_unique_id', 'product_id', 'seller_id', 'review_id', 'mql_id'}
+
+# Reference data that is copied as is. Zip codes and other attributes are never changed in the replicas,
+# which keeps their distributions (e.g. the skew towards few big cities) realistic.
+unscaled_tables = {'geolocation', 'product_category_name_translation'}
+
+
+def _replicate_table(db_alias: str, source_schema: str, target_schema: str, table: str,
+                     first_replica: int, last_replica: int):
+    """Inserts the replicas `first_replica` to `last_replica` of a source table into the target schema"""
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        cursor.execute('''
+SELECT column_name, data_type IN ('text', 'character varying') AND column_name = ANY (%s)
+FROM information_schema.columns
+WHERE table_schema = %s AND table_name = %s
+ORDER BY ordinal_position''', (list(id_columns), source_schema, table))
+        columns = [f'''CASE WHEN replica = 0 THEN "{column_name}" ELSE "{column_name}" || '_' || replica END'''
+                   if is_id_column else f'"{column_name}"'
+                   for column_name, is_id_column in cursor.fetchall()]
+
+        cursor.execute(f'''
+INSERT INTO {target_schema}.{table}
+SELECT {', '.join(columns)}
+FROM {source_schema}.{table}, generate_series({first_replica}, {last_replica}) replica''')
+
+
+@click.command()
+@click.option('--factor', required=True, type=int, help='How many times the data should be replicated, e.g. 100.')
+@click.option('--db-alias', default='olist', help='The database with the source data. Default: "olist".')
+@click.option('--source-schemas', default='ecommerce,marketing',
+              help='The schemas to scale, separated by comma. Default: "ecommerce,marketing".')
+@click.option('--parallelism', default=8, help='How many tables or parts of tables to write at the same time.')
+def generate_synthetic_data(factor: int, db_alias: str, source_schemas: str, parallelism: int):
+    """
+    Writes a scaled copy of the source schemas into `<schema>_x<factor>` schemas of the same database.
+    To load them, change `app.pipelines.config.ecommerce_source_schema` & `marketing_source_schema`.
+    """
+    source_schemas = source_schemas.split(',')
+
+    jobs = []
+    for source_schema in source_schemas:
+        target_schema = f'{source_schema}_x{factor}'
+        with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+            cursor.execute(f'DROP SCHEMA IF EXISTS {target_schema} CASCADE; CREATE SCHEMA {target_schema}')
+            cursor.execute('''
+SELECT table_name
+FROM information_schema.tables
+WHERE table_schema = %s AND table_type = 'BASE TABLE'
+ORDER BY table_name''', (source_schema,))
+            tables = [table for table, in cursor.fetchall()]
+            for table in tables:
+                cursor.execute(f'CREATE TABLE {target_schema}.{table} (LIKE {source_schema}.{table})')
+
+        for table in tables:
+            if table in unscaled_tables:
+                jobs.append((source_schema, target_schema, table, 0, 0))
+            else:
+                # split the replicas of big tables into parts that are written concurrently
+                replicas_per_job = max(1, factor // parallelism)
+                for first_replica in range(0, factor, replicas_per_job):
+                    jobs.append((source_schema, target_schema, table, first_replica,
+                                 min(first_replica + replicas_per_job, factor) - 1))
+
+    start_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = {executor.submit(_replicate_table, db_alias, *job): job for job in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            source_schema, target_schema, table, first_replica, last_replica = futures[future]
+            future.result()
+            print(f'{target_schema}.{table}: replicas {first_replica}-{last_replica} '
+                  f'({time.time() - start_time:.0f}s)')
+
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:
+        cursor.execute('ANALYZE')
+    print(f'Written {", ".join([f"{schema}_x{factor}" for schema in source_schemas])} '
+          f'in {time.time() - start_time:.0f}s')
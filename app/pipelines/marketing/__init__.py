@@ -3,6 +3,20 @@ import pathlib
 from mara_pipelines.commands.sql import ExecuteSQL
 from mara_pipelines.pipelines import Pipeline, Task
 
+from app.pipelines import config
+from app.pipelines.build_cache import CachedExecuteSQL
+from app.pipelines.constraints import add_constraint_tasks, add_fk_function
+from app.pipelines.date_window import date_window_replacements
+from app.pipelines.dependencies import is_in_current_run
+from app.pipelines.session_settings import TunedExecuteSQL, staging_replacements
+
+
+def seller_transformed_in_run() -> bool:
+    """Whether the seller dimension of the e-commerce pipeline is built in the current run"""
+    import app.pipelines.e_commerce
+    return is_in_current_run(app.pipelines.e_commerce.pipeline.nodes['transform_seller'])
+
+
 pipeline = Pipeline(
     id="marketing",
     description="Builds the Leads cube based on marketing and e-commerce data",
@@ -11,7 +25,7 @@ pipeline = Pipeline(
 
 pipeline.add_initial(
     Task(id="initialize_schemas",
-         description="Recreates the schemas of the pipeline",
+         description="Recreates the next schema and creates the tmp schema of the pipeline if missing",
          commands=[
              ExecuteSQL(sql_file_name="recreate_schemas.sql")
          ]))
@@ -20,14 +34,18 @@ pipeline.add(
     Task(id="preprocess_lead",
          description="Preprocess the marketing leads",
          commands=[
-             ExecuteSQL(sql_file_name="preprocess_lead.sql")
+             CachedExecuteSQL(sql_file_name="preprocess_lead.sql",
+                              input_tables=['m_data.marketing_qualified_lead', 'm_data.closed_deal'],
+                              output_tables=['m_tmp.lead'],
+                              replace={**staging_replacements, **date_window_replacements})
          ]))
 
 pipeline.add(
     Task(id="transform_smaller_dimensions",
          description="Transform smaller marketing dimensions",
          commands=[
-             ExecuteSQL(sql_file_name="transform_smaller_dimensions.sql")
+             TunedExecuteSQL(sql_file_name="transform_smaller_dimensions.sql",
+                             session_settings=config.memory_intensive_session_settings)
          ]),
     upstreams=["preprocess_lead"])
 
@@ -35,17 +53,15 @@ pipeline.add(
     Task(id="transform_lead",
          description="Creates the lead dim table",
          commands=[
-             ExecuteSQL(sql_file_name="transform_lead.sql", echo_queries=False)
+             ExecuteSQL(sql_file_name="transform_lead.sql", echo_queries=False,
+                        replace={'@add_fk@': add_fk_function,
+                                 '@seller_transformed_in_run@':
+                                     lambda: 'TRUE' if seller_transformed_in_run() else 'FALSE'})
          ]),
     upstreams=["transform_smaller_dimensions"])
 
-pipeline.add(
-    Task(id="constrain_tables",
-         description="Adds foreign key constrains between the dim tables",
-         commands=[
-             ExecuteSQL(sql_file_name="constrain_tables.sql", echo_queries=False)
-         ]),
-    upstreams=["transform_lead"])
+add_constraint_tasks(pipeline, {'lead': 'm_tmp.constrain_lead'}, schema_name='m_dim_next',
+                     upstreams=["transform_lead"])
 
 pipeline.add_final(
     Task(id="replace_schema",
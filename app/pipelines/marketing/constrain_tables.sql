@@ -1 +0,0 @@
-SELECT m_tmp.constrain_lead();
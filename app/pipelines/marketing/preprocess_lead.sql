@@ -44,7 +44,9 @@ SELECT mql_id                                    AS lead_id,
        COALESCE(origin, 'Unknown')               AS advertising_channel,
        won_date::DATE - first_contact_date::DATE AS days_to_closing_deal
 FROM m_data.marketing_qualified_lead
-         LEFT JOIN m_data.closed_deal USING (mql_id);
+         LEFT JOIN m_data.closed_deal USING (mql_id)
+-- only leads within the processed days (see app.pipelines.date_window)
+WHERE first_contact_date >= '@first_date@' AND first_contact_date < '@last_date@'::DATE + 1;
 
 SELECT util.add_index('m_tmp', 'lead',
                       column_names := ARRAY ['lead_id', 'seller_id']);
@@ -1,5 +1,5 @@
 DROP SCHEMA IF EXISTS m_dim_next CASCADE;
 CREATE SCHEMA m_dim_next;
 
-DROP SCHEMA IF EXISTS m_tmp CASCADE;
-CREATE SCHEMA m_tmp;
+-- Kept between runs so that unchanged preprocessing results can be reused (see app.pipelines.build_cache)
+CREATE SCHEMA IF NOT EXISTS m_tmp;
@@ -1,3 +1,32 @@
+-- The lead dimension is built while the e-commerce pipeline is still running (only transform_seller needs to
+-- have finished). Depending on whether the e-commerce schema was already replaced, the new seller table is in
+-- ec_dim_next or ec_dim. When transform_seller is part of the run but its table is missing (because it failed),
+-- the leads are not built against the seller table of the previous run.
+CREATE OR REPLACE FUNCTION m_tmp.seller_schema()
+    RETURNS TEXT AS
+$$
+BEGIN
+    IF to_regclass('ec_dim_next.seller') IS NOT NULL THEN
+        RETURN 'ec_dim_next';
+    ELSIF @seller_transformed_in_run@ AND exists(SELECT 1 FROM pg_namespace WHERE nspname = 'ec_dim_next') THEN
+        RAISE EXCEPTION 'ec_dim_next.seller does not exist, although transform_seller is part of the run';
+    ELSE
+        RETURN 'ec_dim';
+    END IF;
+END
+$$
+    LANGUAGE plpgsql;
+
+-- A view binds to the table itself, so it stays valid when ec_dim_next is renamed.
+DROP VIEW IF EXISTS m_tmp.seller;
+
+DO
+$$
+    BEGIN
+        EXECUTE format('CREATE VIEW m_tmp.seller AS SELECT * FROM %I.seller', m_tmp.seller_schema());
+    END
+$$;
+
 DROP TABLE IF EXISTS m_dim_next.lead CASCADE;
 CREATE TABLE m_dim_next.lead
 (
@@ -64,7 +93,7 @@ SELECT lead_id                                                        AS lead_id
        seller.revenue_lifetime                                        AS revenue_lifetime,
        days_to_closing_deal                                           AS days_to_closing_deal
 FROM m_tmp.lead
-         LEFT JOIN ec_dim.seller USING (seller_id);
+         LEFT JOIN m_tmp.seller USING (seller_id);
 
 SELECT util.add_index('m_dim_next', 'lead',
                       column_names := ARRAY ['seller_fk']);
@@ -74,6 +103,9 @@ ANALYZE m_dim_next.lead;
 CREATE OR REPLACE FUNCTION m_tmp.constrain_lead()
     RETURNS VOID AS
 $$
-SELECT util.add_fk('m_dim_next', 'lead', 'ec_dim', 'seller');
+BEGIN
+    -- the same seller table as in m_tmp.seller
+    PERFORM @add_fk@('m_dim_next', 'lead', m_tmp.seller_schema(), 'seller');
+END
 $$
-    LANGUAGE sql;
+    LANGUAGE plpgsql;
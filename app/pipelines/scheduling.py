@@ -0,0 +1,43 @@
+"""Prioritization of the nodes on the critical path of pipelines based on their historical durations"""
+
+import mara_db.postgresql
+from mara_app.monkey_patch import wrap
+from mara_pipelines import pipelines
+from mara_pipelines.logging import node_cost
+
+from app.pipelines import config
+
+
+@wrap(node_cost.node_durations_and_run_times)
+def node_durations_and_run_times(original_function, node: pipelines.Node) -> {tuple: [float, float]}:
+    """
+    Returns for children of `node` the median duration in their last `config.scheduling_history_runs()`
+    successful runs, both as duration and as run time.
+
+    The scheduler orders runnable nodes by their cost, which is the run time of a node plus the maximum cost of its
+    downstreams. The original run time of a pipeline is the sum of the durations of all its tasks, which ranks
+    big sub pipelines with many parallel tasks ahead of long sequential chains. Using the wall time of pipelines
+    instead makes the cost the length of the critical path from the node to the end of the run. A median of recent
+    runs is not skewed by single slow runs or by runs of long gone versions of the code.
+    """
+    if not config.critical_path_scheduling():
+        return original_function(node)
+
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute(f"""
+WITH node_run AS (
+    SELECT node_path,
+           extract(EPOCH FROM end_time - start_time)                          AS duration,
+           row_number() OVER (PARTITION BY node_path ORDER BY end_time DESC) AS number
+    FROM data_integration_node_run
+    WHERE node_path [ 0 : {'%(level)s'}] = %(path)s
+      AND array_length(node_path, 1) = {'%(level)s'} + 1
+      AND succeeded = TRUE)
+SELECT node_path,
+       round(percentile_cont(0.5) WITHIN GROUP (ORDER BY duration)::NUMERIC, 1) AS median_duration
+FROM node_run
+WHERE number <= %(runs)s
+GROUP BY node_path;""", {'path': node.path(), 'level': len(node.path()), 'runs': config.scheduling_history_runs()})
+
+        return {tuple(node_path): [median_duration, median_duration]
+                for node_path, median_duration in cursor.fetchall()}
@@ -0,0 +1,54 @@
+"""Sql commands with their own database session settings and unlogged staging tables"""
+
+import shlex
+from typing import Callable, Union
+
+import mara_db.shell
+from mara_page import html
+from mara_pipelines.commands.sql import ExecuteSQL, _SQLCommand
+
+from . import config
+
+
+class TunedExecuteSQL(ExecuteSQL):
+    def __init__(self, sql_statement: str = None, sql_file_name: str = None, replace: {str: str} = None,
+                 file_dependencies=None, db_alias: str = None, echo_queries: bool = True, timezone: str = None,
+                 session_settings: Union[Callable, dict] = None) -> None:
+        """
+        Runs an sql file or statement in a database after changing settings of the database session
+
+        Args:
+            session_settings: Settings that are applied with `SET` before the sql runs,
+                              e.g. `{'work_mem': '1GB'}`, or a function that returns them
+        """
+        super().__init__(sql_statement=sql_statement, sql_file_name=sql_file_name, replace=replace,
+                         file_dependencies=file_dependencies, db_alias=db_alias, echo_queries=echo_queries,
+                         timezone=timezone)
+        self._session_settings = session_settings or {}
+
+    @property
+    def session_settings(self) -> dict:
+        return self._session_settings() if callable(self._session_settings) else self._session_settings
+
+    def shell_command(self):
+        if not self.session_settings:
+            return super().shell_command()
+
+        set_statements = ''.join([f"SET {name} = '{value}';\n" for name, value in self.session_settings.items()])
+        return f'(echo {shlex.quote(set_statements)} \\\n  && ' + _SQLCommand.shell_command(self) + ') \\\n' \
+               + '  | ' + mara_db.shell.query_command(self.db_alias, self.timezone, self.echo_queries)
+
+    def html_doc_items(self):
+        return super().html_doc_items() \
+               + [('session settings', html.highlight_syntax(
+                    '\n'.join([f"SET {name} = '{value}';" for name, value in self.session_settings.items()]),
+                    'sql'))]
+
+
+def create_staging_table() -> str:
+    """The statement for creating tables in the tmp schemas, see `config.unlogged_staging_tables`"""
+    return 'CREATE UNLOGGED TABLE' if config.unlogged_staging_tables() else 'CREATE TABLE'
+
+
+staging_replacements = {'CREATE TABLE': create_staging_table}
+"""Replacements for the preprocessing sql files that create tables in the tmp schemas"""
@@ -0,0 +1,239 @@
+"""Recording of the plans, buffer usage and written rows & bytes of the statements of sql commands"""
+
+import datetime
+import functools
+import json
+import os
+import re
+import shlex
+import tempfile
+
+import mara_db.dbs
+import mara_db.postgresql
+import mara_db.shell
+import sqlalchemy
+from mara_app.monkey_patch import wrap
+from mara_pipelines.commands.sql import ExecuteSQL
+from mara_pipelines.logging import logger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.declarative import declarative_base
+
+from app.pipelines import config
+
+Base = declarative_base()
+
+
+class SqlTelemetryCommand(Base):
+    """A run of an sql command with telemetry"""
+    __tablename__ = 'data_integration_sql_telemetry_command'
+
+    command_id = sqlalchemy.Column(sqlalchemy.INTEGER, primary_key=True, autoincrement=True)
+    node_path = sqlalchemy.Column(sqlalchemy.ARRAY(sqlalchemy.TEXT), nullable=False, index=True)
+    command = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
+    start_time = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True), nullable=False, index=True)
+    end_time = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True), nullable=False)
+    succeeded = sqlalchemy.Column(sqlalchemy.BOOLEAN, nullable=False)
+
+
+class SqlTelemetryStatement(Base):
+    """The plan and statistics of a statement that was run by an sql command"""
+    __tablename__ = 'data_integration_sql_telemetry_statement'
+
+    command_id = sqlalchemy.Column(sqlalchemy.INTEGER,
+                                   sqlalchemy.ForeignKey(SqlTelemetryCommand.command_id, ondelete='CASCADE'),
+                                   primary_key=True)
+    statement_number = sqlalchemy.Column(sqlalchemy.INTEGER, primary_key=True)
+    query_text = sqlalchemy.Column(sqlalchemy.TEXT)
+    duration = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+    rows = sqlalchemy.Column(sqlalchemy.BIGINT)
+    shared_blocks_hit = sqlalchemy.Column(sqlalchemy.BIGINT)
+    shared_blocks_read = sqlalchemy.Column(sqlalchemy.BIGINT)
+    temp_blocks_read = sqlalchemy.Column(sqlalchemy.BIGINT)
+    temp_blocks_written = sqlalchemy.Column(sqlalchemy.BIGINT)
+    plan = sqlalchemy.Column(JSONB)
+
+
+class SqlTelemetryTableSize(Base):
+    """How much the size of a table changed during an sql command"""
+    __tablename__ = 'data_integration_sql_telemetry_table_size'
+
+    command_id = sqlalchemy.Column(sqlalchemy.INTEGER,
+                                   sqlalchemy.ForeignKey(SqlTelemetryCommand.command_id, ondelete='CASCADE'),
+                                   primary_key=True)
+    table_name = sqlalchemy.Column(sqlalchemy.TEXT, primary_key=True)
+    size_delta = sqlalchemy.Column(sqlalchemy.BIGINT, nullable=False)
+
+
+_plan_file: str = None
+"""The file that receives the plans of the statements of the currently running command (in a task process)"""
+
+
+def is_recorded(command: ExecuteSQL) -> bool:
+    """Whether telemetry is recorded for an sql command"""
+    return bool(config.sql_telemetry() and command.parent
+                and command.parent.path()[0] in config.sql_telemetry_pipelines()
+                and isinstance(mara_db.dbs.db(command.db_alias), mara_db.dbs.PostgreSQLDB))
+
+
+def session_settings() -> str:
+    """
+    Makes auto_explain send the plans of all statements that run longer than `config.sql_telemetry_min_duration`
+    (including those in functions) as notices to psql. Needs the permission to load the module.
+    """
+    return f'''LOAD 'auto_explain';
+SET auto_explain.log_min_duration = {int(config.sql_telemetry_min_duration() * 1000)};
+SET auto_explain.log_analyze = on;
+SET auto_explain.log_buffers = on;
+SET auto_explain.log_timing = off;
+SET auto_explain.log_nested_statements = on;
+SET auto_explain.log_format = json;
+SET auto_explain.log_level = notice;
+SET client_min_messages = notice;
+'''
+
+
+@wrap(mara_db.shell.query_command)
+def query_command(original_function, db: object, timezone: str = None, echo_queries: bool = None) -> str:
+    """While a command with telemetry runs, auto_explain is activated and the messages of psql go to a file"""
+    command = original_function(db, timezone=timezone, echo_queries=echo_queries)
+    # for aliases, the original function calls itself again with the database of the alias
+    if not _plan_file or not isinstance(db, str):
+        return command
+    return f'(echo {shlex.quote(session_settings())} && cat) \\\n  | {command} 2>>{shlex.quote(_plan_file)}'
+
+
+def table_sizes(db_alias: str) -> {str: int}:
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        cursor.execute('''
+SELECT pg_class.oid :: REGCLASS :: TEXT, pg_total_relation_size(pg_class.oid)
+FROM pg_class
+  JOIN pg_namespace ON pg_namespace.oid = relnamespace
+WHERE relkind IN ('r', 'm')
+  AND nspname NOT IN ('pg_catalog', 'information_schema') AND nspname NOT LIKE 'pg_toast%' ''')
+        return dict(cursor.fetchall())
+
+
+plan_message = re.compile(r'^(?:psql:\S+ )?NOTICE:  duration: ([0-9.]+) ms  plan:\n', re.MULTILINE)
+
+
+def parse_messages(messages: str) -> ([(float, dict)], [str]):
+    """Splits the messages of psql into the durations & plans of statements and all other messages"""
+    plans = []
+    other_messages = []
+    position = 0
+    for match in plan_message.finditer(messages):
+        if match.start() < position:  # in a plan that was already parsed
+            continue
+        other_messages.append(messages[position:match.start()])
+        decoder_position = len(messages) - len(messages[match.end():].lstrip())
+        plan, position = json.JSONDecoder().raw_decode(messages, decoder_position)
+        plans.append((float(match.group(1)) / 1000, plan))
+    other_messages.append(messages[position:])
+    return plans, [line for line in ''.join(other_messages).splitlines() if line.strip()]
+
+
+def rows_of_plan(plan: dict) -> int:
+    """The rows returned by a statement or, for INSERT, UPDATE and DELETE, the rows that it modified"""
+    if plan.get('Node Type') == 'ModifyTable' and plan.get('Plans'):
+        return plan['Plans'][0].get('Actual Rows')
+    return plan.get('Actual Rows')
+
+
+def store_command(command: ExecuteSQL, start_time: datetime.datetime, succeeded: bool,
+                  plans: [(float, dict)], size_deltas: {str: int}):
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+INSERT INTO data_integration_sql_telemetry_command (node_path, command, start_time, end_time, succeeded)
+VALUES (%s, %s, %s, %s, %s)
+RETURNING command_id''', (command.parent.path(), command.sql_file_name or command.sql_statement[:1000],
+                          start_time, datetime.datetime.now(datetime.timezone.utc), succeeded))
+        command_id = cursor.fetchone()[0]
+
+        for statement_number, (duration, explain_output) in enumerate(plans):
+            plan = explain_output.get('Plan', {})
+            cursor.execute('''
+INSERT INTO data_integration_sql_telemetry_statement
+  (command_id, statement_number, query_text, duration, rows, shared_blocks_hit, shared_blocks_read,
+   temp_blocks_read, temp_blocks_written, plan)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+                           (command_id, statement_number, explain_output.get('Query Text'), duration,
+                            rows_of_plan(plan), plan.get('Shared Hit Blocks'), plan.get('Shared Read Blocks'),
+                            plan.get('Temp Read Blocks'), plan.get('Temp Written Blocks'), json.dumps(plan)))
+
+        for table_name, size_delta in size_deltas.items():
+            cursor.execute('''
+INSERT INTO data_integration_sql_telemetry_table_size (command_id, table_name, size_delta)
+VALUES (%s, %s, %s)''', (command_id, table_name, size_delta))
+
+
+_original_run = ExecuteSQL.run
+
+
+@functools.wraps(_original_run)
+def run(command: ExecuteSQL) -> bool:
+    """Records the plans and table size changes of the statements of a command, see `config.sql_telemetry`"""
+    global _plan_file
+
+    if not is_recorded(command):
+        return _original_run(command)
+
+    start_time = datetime.datetime.now(datetime.timezone.utc)
+    sizes_before = table_sizes(command.db_alias)
+    file_descriptor, _plan_file = tempfile.mkstemp(prefix='sql-telemetry-', suffix='.log')
+    os.close(file_descriptor)
+    try:
+        succeeded = _original_run(command)
+        with open(_plan_file) as plan_file:
+            plans, other_messages = parse_messages(plan_file.read())
+    finally:
+        os.remove(_plan_file)
+        _plan_file = None
+
+    # the messages that psql would have written to stderr
+    for message in other_messages:
+        logger.log(message, format=logger.Format.VERBATIM, is_error=True)
+
+    sizes_after = table_sizes(command.db_alias)
+    size_deltas = {table_name: sizes_after.get(table_name, 0) - sizes_before.get(table_name, 0)
+                   for table_name in set(sizes_before) | set(sizes_after)
+                   if sizes_after.get(table_name, 0) != sizes_before.get(table_name, 0)}
+
+    store_command(command, start_time, succeeded, plans, size_deltas)
+    return succeeded
+
+
+# also applies to subclasses such as `TunedExecuteSQL` and `CachedExecuteSQL`
+ExecuteSQL.run = run
+
+
+def top_statements(node_path: [str], limit: int) -> [dict]:
+    """
+    The most expensive statements of the tasks of a node in the last pipeline run that recorded telemetry for them.
+    A statement belongs to the run in whose time span its command started.
+    """
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+WITH command AS (SELECT * FROM data_integration_sql_telemetry_command
+                 WHERE node_path[1:%(depth)s] = %(node_path)s :: TEXT[]),
+     run AS (SELECT run_id, start_time, coalesce(end_time, now()) AS end_time
+             FROM data_integration_run run
+             WHERE EXISTS(SELECT 1 FROM command
+                          WHERE command.start_time BETWEEN run.start_time AND coalesce(run.end_time, now()))
+             ORDER BY run_id DESC
+             LIMIT 1)
+SELECT run.run_id, command.node_path, command.command, statement.query_text, statement.duration, statement.rows,
+       statement.shared_blocks_hit, statement.shared_blocks_read, statement.temp_blocks_written,
+       (SELECT sum(size_delta) FROM data_integration_sql_telemetry_table_size size
+        WHERE size.command_id = command.command_id)
+FROM data_integration_sql_telemetry_statement statement
+  JOIN command USING (command_id)
+  JOIN run ON command.start_time BETWEEN run.start_time AND run.end_time
+ORDER BY statement.duration DESC
+LIMIT %(limit)s''', {'node_path': node_path, 'depth': len(node_path), 'limit': limit})
+
+        return [{'run_id': run_id, 'node_path': path, 'command': command_, 'query_text': query_text,
+                 'duration': duration, 'rows': rows, 'shared_blocks_hit': shared_blocks_hit,
+                 'shared_blocks_read': shared_blocks_read, 'temp_blocks_written': temp_blocks_written,
+                 'command_size_delta': command_size_delta}
+                for run_id, path, command_, query_text, duration, rows, shared_blocks_hit, shared_blocks_read,
+                    temp_blocks_written, command_size_delta in cursor.fetchall()]
@@ -21,14 +21,25 @@ pipeline.add(
 
 def write_mondrian_schema():
     import mara_mondrian.schema_generation
+    from lxml import etree
+
+    from app.pipelines.generate_artifacts.mondrian_aggregates import aggregate_xml
+    from app.schema.mondrian_aggregates import mondrian_aggregates
+
     file_name = pathlib.Path('.mondrian-schema.xml')
     logger.log(f'Writing {file_name}', logger.Format.ITALICS)
 
-    mara_mondrian.schema_generation.write_mondrian_schema(
-        file_name=pathlib.Path('.mondrian-schema.xml'),
-        data_set_tables={data_set: ('mondrian', data_set.id()) for data_set in mara_schema.config.data_sets()},
-        personal_data=False,
-        high_cardinality_attributes=False)
+    # same as mara_mondrian.schema_generation.write_mondrian_schema, plus the declaration of aggregate tables
+    root = etree.Element("Schema", name='Mondrian')
+    for data_set in mara_schema.config.data_sets():
+        cube = mara_mondrian.schema_generation.cube_xml(data_set, 'mondrian', data_set.id(),
+                                                        personal_data=False, high_cardinality_attributes=False)
+        for aggregate in mondrian_aggregates.get(data_set.id(), []):
+            cube.find('Table').append(aggregate_xml(aggregate))
+        root.append(cube)
+
+    etree.ElementTree(root).write(file_name.absolute().as_uri(), encoding='utf-8', pretty_print=True,
+                                  xml_declaration=True)
 
     return True
 
@@ -0,0 +1,65 @@
+"""Approximate distinct counts of data set metrics from HyperLogLog sketches in daily rollup tables"""
+
+import math
+
+from mara_schema.data_set import DataSet
+from mara_schema.metric import Aggregation, SimpleMetric
+
+
+class HllRollup():
+    def __init__(self, data_set: DataSet, metric_names: [str], date_attribute: str,
+                 dimension_attributes: [str] = None, log2m: int = 11) -> None:
+        """
+        A table with one row per day (and dimension values) that stores the distinct values of metrics as
+        HyperLogLog sketches (https://github.com/citusdata/postgresql-hll). Sketches of several days can be merged,
+        so that the distinct count over a month is computed from 30 small sketches instead of all rows.
+
+        Args:
+            data_set: The data set of the metrics
+            metric_names: The names of `DISTINCT_COUNT` metrics of the data set
+            date_attribute: The date attribute of the data set that defines the day of a row
+            dimension_attributes: Further (low cardinality) attributes to group by
+            log2m: The log-base-2 of the number of registers of a sketch. More registers make
+                   the sketches bigger and the counts more accurate, see `relative_error`
+        """
+        for metric_name in metric_names:
+            metric = data_set.metrics.get(metric_name)
+            if not isinstance(metric, SimpleMetric) or metric.aggregation != Aggregation.DISTINCT_COUNT:
+                raise ValueError(f'"{metric_name}" is not a distinct count metric of "{data_set.name}"')
+
+        self.data_set = data_set
+        self.metric_names = metric_names
+        self.date_attribute = date_attribute
+        self.dimension_attributes = dimension_attributes or []
+        self.log2m = log2m
+
+    def table_name(self) -> str:
+        return f'{self.data_set.id()}_daily'
+
+    def relative_error(self) -> float:
+        """The standard error of the distinct counts: 1.04 / sqrt(2^log2m), e.g. 2.3% for log2m = 11"""
+        return 1.04 / math.sqrt(2 ** self.log2m)
+
+
+hll_rollups: {str: HllRollup} = {}
+"""All configured rollups by data set id"""
+
+
+def add_hll_rollup(data_set: DataSet, metric_names: [str], date_attribute: str,
+                   dimension_attributes: [str] = None, log2m: int = 11) -> HllRollup:
+    """
+    Computes approximate distinct counts for metrics of a data set in a daily rollup table
+    (see `HllRollup` for the arguments)
+
+    Example:
+    >>> add_hll_rollup(order_items_data_set, ['# Orders'], date_attribute='Order date')
+
+    Querying a rollup:
+        SELECT date_trunc('month', "Order date"), hll_cardinality(hll_union_agg("# Orders"))
+        FROM hll_rollups.order_items_daily
+        GROUP BY 1
+    """
+    hll_rollup = HllRollup(data_set=data_set, metric_names=metric_names, date_attribute=date_attribute,
+                           dimension_attributes=dimension_attributes, log2m=log2m)
+    hll_rollups[data_set.id()] = hll_rollup
+    return hll_rollup
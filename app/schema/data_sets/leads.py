@@ -1,6 +1,7 @@
 from mara_schema.data_set import DataSet, Aggregation
 
 from ..entities.lead import lead_entity
+from ..mondrian_aggregates import add_mondrian_aggregate
 
 leads_data_set = DataSet(entity=lead_entity, name='Leads')
 
@@ -28,3 +29,7 @@ leads_data_set.add_composed_metric(
     name='AOV',
     description='The average revenue per order. Attention: not meaningful when split by product',
     formula='[Revenue (lifetime)] / [# Orders (lifetime)]')
+
+# the most common pivot in Saiku
+add_mondrian_aggregate(leads_data_set, date_attribute='First contact date', date_level='Month',
+                       attributes=['Advertising channel'])
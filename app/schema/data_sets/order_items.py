@@ -1,6 +1,8 @@
 from mara_schema.data_set import DataSet, Aggregation
 
+from ..approximate_distinct_counts import add_hll_rollup
 from ..entities.order_item import order_item_entity
+from ..mondrian_aggregates import add_mondrian_aggregate
 
 order_items_data_set = DataSet(entity=order_item_entity, name='Order items')
 
@@ -54,3 +56,11 @@ order_items_data_set.add_composed_metric(
     name='AOV',
     description='The average revenue per order. Attention: not meaningful when split by product',
     formula='[Revenue] / [# Orders]')
+
+# distinct orders per month etc. are computed from daily HyperLogLog sketches (standard error 2.3%)
+add_hll_rollup(order_items_data_set, metric_names=['# Orders', '# First orders'],
+               date_attribute='Order date', dimension_attributes=['Order status'])
+
+# the most common pivots in Saiku
+add_mondrian_aggregate(order_items_data_set, date_attribute='Order date', date_level='Month',
+                       attributes=['Customer state', 'Product category'])
@@ -0,0 +1,66 @@
+"""Pre-aggregated tables that Mondrian uses instead of the fact tables of data sets"""
+
+from mara_schema.attribute import Type
+from mara_schema.data_set import DataSet
+from mara_schema.sql_generation import database_identifier
+
+date_levels = ['Year', 'Quarter', 'Month', 'Day']
+
+
+class MondrianAggregate():
+    def __init__(self, data_set: DataSet, date_attribute: str = None, date_level: str = 'Month',
+                 attributes: [str] = None) -> None:
+        """
+        An aggregate table of the Mondrian fact table of a data set. It contains all simple metrics of the data set
+        grouped by some of its attributes. Mondrian answers all queries on these attributes (or a subset of them)
+        from the aggregate table.
+
+        Args:
+            data_set: The data set to aggregate
+            date_attribute: A date attribute to group by
+            date_level: The lowest level of the "By month" hierarchy of the date attribute to group by,
+                        one of 'Year', 'Quarter', 'Month', 'Day'
+            attributes: Further (not personal data, not high cardinality) attributes to group by
+        """
+        connected_attributes = {name: attribute for attributes in data_set.connected_attributes().values()
+                                for name, attribute in attributes.items()}
+        if date_attribute and (date_attribute not in connected_attributes
+                               or connected_attributes[date_attribute].type != Type.DATE):
+            raise ValueError(f'"{date_attribute}" is not a date attribute of "{data_set.name}"')
+        if date_level not in date_levels:
+            raise ValueError(f'Invalid date level "{date_level}", should be one of {", ".join(date_levels)}')
+        for name in attributes or []:
+            if name not in connected_attributes:
+                raise ValueError(f'"{name}" is not an attribute of "{data_set.name}"')
+            if connected_attributes[name].personal_data or connected_attributes[name].high_cardinality:
+                raise ValueError(f'"{name}" is not available in Mondrian')
+
+        self.data_set = data_set
+        self.date_attribute = date_attribute
+        self.date_level = date_level
+        self.attributes = attributes or []
+
+    def table_name(self) -> str:
+        """E.g. `agg_order_items_order_date_month_customer_state`"""
+        return database_identifier('_'.join(
+            ['agg', self.data_set.id()]
+            + ([self.date_attribute, self.date_level] if self.date_attribute else [])
+            + self.attributes))
+
+
+mondrian_aggregates: {str: [MondrianAggregate]} = {}
+"""All configured aggregates by data set id"""
+
+
+def add_mondrian_aggregate(data_set: DataSet, date_attribute: str = None, date_level: str = 'Month',
+                           attributes: [str] = None) -> MondrianAggregate:
+    """
+    Adds an aggregate table for Mondrian to a data set (see `MondrianAggregate` for the arguments)
+
+    Example:
+    >>> add_mondrian_aggregate(order_items_data_set, date_attribute='Order date', attributes=['Customer state'])
+    """
+    mondrian_aggregate = MondrianAggregate(data_set=data_set, date_attribute=date_attribute, date_level=date_level,
+                                           attributes=attributes)
+    mondrian_aggregates.setdefault(data_set.id(), []).append(mondrian_aggregate)
+    return mondrian_aggregate
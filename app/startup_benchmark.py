@@ -0,0 +1,119 @@
+"""Measurement of the import time of the app (as paid by every flask command and web server worker)"""
+
+import datetime
+import pathlib
+import subprocess
+import sys
+import time
+
+import click
+import mara_db.postgresql
+import sqlalchemy
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+
+class StartupBenchmarkRun(Base):
+    """A measurement of the time it takes to start the app"""
+    __tablename__ = 'app_startup_benchmark_run'
+
+    run_id = sqlalchemy.Column(sqlalchemy.INTEGER, primary_key=True, autoincrement=True)
+    label = sqlalchemy.Column(sqlalchemy.TEXT)
+    start_time = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True), nullable=False)
+    import_time = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+    wall_time = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+
+
+class StartupBenchmarkImport(Base):
+    """The import time of one of the slowest modules in a startup benchmark run"""
+    __tablename__ = 'app_startup_benchmark_import'
+
+    run_id = sqlalchemy.Column(sqlalchemy.INTEGER,
+                               sqlalchemy.ForeignKey(StartupBenchmarkRun.run_id, ondelete='CASCADE'),
+                               primary_key=True)
+    module = sqlalchemy.Column(sqlalchemy.TEXT, primary_key=True)
+    self_time = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+    cumulative_time = sqlalchemy.Column(sqlalchemy.FLOAT, nullable=False)
+
+
+def parse_import_times(output: str) -> {str: (float, float)}:
+    """Self and cumulative import time in seconds by module, from the output of `python -X importtime`"""
+    import_times = {}
+    for line in output.splitlines():
+        # e.g. "import time:       375 |      18563 |   app.pipelines"
+        if line.startswith('import time:') and not line.endswith('imported package'):
+            self_time, cumulative_time, module = line[len('import time:'):].split('|')
+            import_times[module.strip()] = (int(self_time) / 1e6, int(cumulative_time) / 1e6)
+    return import_times
+
+
+def slowest_imports(import_times: {str: (float, float)}, number: int) -> [(str, (float, float))]:
+    """The modules with the highest cumulative import time"""
+    return sorted(import_times.items(), key=lambda item: item[1][1], reverse=True)[:number]
+
+
+def measure_startup() -> (float, {str: (float, float)}):
+    """
+    Imports the flask app (which creates it) in a new interpreter.
+    Returns the wall time of the interpreter and the import times of all modules.
+    """
+    start_time = time.time()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.app'],
+                             cwd=pathlib.Path(__file__).parent.parent, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    wall_time = time.time() - start_time
+    if process.returncode != 0:
+        raise click.ClickException(f'Importing the app failed:\n{process.stderr[-2000:]}')
+    return wall_time, parse_import_times(process.stderr)
+
+
+def store_run(label: str, wall_time: float, import_times: {str: (float, float)}, number_of_imports: int) -> int:
+    """Stores the import time of the app and of its slowest modules and returns the id of the run"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+INSERT INTO app_startup_benchmark_run (label, start_time, import_time, wall_time)
+VALUES (%s, %s, %s, %s)
+RETURNING run_id''', (label, datetime.datetime.now(datetime.timezone.utc), import_times['app.app'][1], wall_time))
+        run_id = cursor.fetchone()[0]
+
+        for module, (self_time, cumulative_time) in slowest_imports(import_times, number_of_imports):
+            cursor.execute('''
+INSERT INTO app_startup_benchmark_import (run_id, module, self_time, cumulative_time)
+VALUES (%s, %s, %s, %s)''', (run_id, module, self_time, cumulative_time))
+        return run_id
+
+
+def runs(limit: int = 50) -> [StartupBenchmarkRun]:
+    """The last startup benchmark runs"""
+    with mara_db.postgresql.postgres_cursor_context('mara') as cursor:
+        cursor.execute('''
+SELECT run_id, label, start_time, import_time, wall_time
+FROM app_startup_benchmark_run
+ORDER BY run_id DESC
+LIMIT %s''', (limit,))
+        return [StartupBenchmarkRun(run_id=run_id, label=label, start_time=start_time, import_time=import_time,
+                                    wall_time=wall_time)
+                for run_id, label, start_time, import_time, wall_time in cursor.fetchall()]
+
+
+@click.command()
+@click.option('--label', help='A description of the benchmarked code, e.g. a git commit.')
+@click.option('--repetitions', default=5, help='How often to start the app. Default: 5.')
+@click.option('--imports', 'number_of_imports', default=30,
+              help='For how many of the slowest modules to store the import time. Default: 30.')
+def benchmark_startup(label: str, repetitions: int, number_of_imports: int):
+    """Measures how long it takes to import & create the app and stores the run of the median import time"""
+    measurements = sorted([measure_startup() for _ in range(repetitions)],
+                          key=lambda measurement: measurement[1]['app.app'][1])
+    wall_time, import_times = measurements[len(measurements) // 2]
+
+    run_id = store_run(label, wall_time, import_times, number_of_imports)
+
+    print(f'\nStartup benchmark run {run_id}: '
+          f'{import_times["app.app"][1]:.2f}s import time, {wall_time:.2f}s wall time '
+          f'(median of {repetitions}, wall times between '
+          f'{min(measurement[0] for measurement in measurements):.2f}s and '
+          f'{max(measurement[0] for measurement in measurements):.2f}s)\n')
+    for module, (self_time, cumulative_time) in slowest_imports(import_times, number_of_imports):
+        print(f'{module:<70} {cumulative_time:8.3f}s {self_time:8.3f}s')
@@ -15,7 +15,8 @@ import mara_mondrian.config
 import mara_page.acl
 import mara_pipelines
 import mara_schema
-from app.ui import start_page
+from app.ui import benchmarks, connection_pools, data_explorer_cache, graph_cache, instrumentation, \
+    permission_cache, sql_telemetry, start_page
 from mara_app import monkey_patch
 from mara_page import acl
 from mara_page import navigation
@@ -24,7 +25,8 @@ blueprint = flask.Blueprint('ui', __name__, url_prefix='/ui', static_folder='sta
 
 
 def MARA_FLASK_BLUEPRINTS():
-    return [start_page.blueprint, blueprint]
+    return [start_page.blueprint, benchmarks.blueprint, data_explorer_cache.blueprint, graph_cache.blueprint,
+            connection_pools.blueprint, instrumentation.blueprint, sql_telemetry.blueprint, blueprint]
 
 
 # replace logo and favicon
@@ -46,7 +48,8 @@ def acl_resources():
     return [acl.AclResource(name='Documentation',
                             children=[mara_pipelines.MARA_ACL_RESOURCES().get('Pipelines'),
                                       mara_db.MARA_ACL_RESOURCES().get('DB Schema'),
-                                      mara_schema.MARA_ACL_RESOURCES()['Schema']]),
+                                      mara_schema.MARA_ACL_RESOURCES()['Schema'],
+                                      benchmarks.acl_resource]),
             acl.AclResource(name='Data',
                             children=[*mara_data_explorer.MARA_ACL_RESOURCES().values(),
                                       *mara_metabase.MARA_ACL_RESOURCES().values(),
@@ -54,15 +57,19 @@ def acl_resources():
                                       ]),
             acl.AclResource(name='Admin',
                             children=[mara_app.MARA_ACL_RESOURCES().get('Configuration'),
-                                      mara_acl.MARA_ACL_RESOURCES().get('Acl')])]
+                                      mara_acl.MARA_ACL_RESOURCES().get('Acl'),
+                                      data_explorer_cache.acl_resource,
+                                      connection_pools.acl_resource,
+                                      instrumentation.acl_resource])]
 
 
 # activate ACL
 monkey_patch.patch(mara_page.acl.current_user_email)(mara_acl.users.current_user_email)
-monkey_patch.patch(mara_page.acl.current_user_has_permissions)(mara_acl.permissions.current_user_has_permissions)
+monkey_patch.patch(mara_page.acl.current_user_has_permissions)(permission_cache.current_user_has_permissions)
 monkey_patch.patch(mara_page.acl.user_has_permissions)(mara_acl.permissions.user_has_permissions)
 
-monkey_patch.patch(mara_acl.config.whitelisted_uris)(lambda: ['/mara-app/navigation-bar', '/mondrian/saiku/authorize'])
+monkey_patch.patch(mara_acl.config.whitelisted_uris)(
+    lambda: ['/mara-app/navigation-bar', '/mondrian/saiku/authorize', '/instrumentation/metrics'])
 
 # enable user and permission sync from mara acl to Metabase
 mara_metabase.acl.enable_automatic_sync_of_users_and_permissions_to_metabase()
@@ -78,8 +85,12 @@ def navigation_root() -> navigation.NavigationEntry:
         *mara_data_explorer.MARA_NAVIGATION_ENTRIES().values(),
         *mara_schema.MARA_NAVIGATION_ENTRIES().values(),
         *mara_pipelines.MARA_NAVIGATION_ENTRIES().values(),
+        benchmarks.navigation_entry(),
         *mara_db.MARA_NAVIGATION_ENTRIES().values(),
         navigation.NavigationEntry(
             'Settings', icon='cog', description='ACL & Configuration', rank=100,
             children=[*mara_app.MARA_NAVIGATION_ENTRIES().values(),
-                      *mara_acl.MARA_NAVIGATION_ENTRIES().values()])])
+                      *mara_acl.MARA_NAVIGATION_ENTRIES().values(),
+                      data_explorer_cache.navigation_entry(),
+                      connection_pools.navigation_entry(),
+                      instrumentation.navigation_entry()])])
@@ -0,0 +1,92 @@
+"""Pages for comparing the benchmark runs of pipelines"""
+
+import flask
+from mara_page import acl, bootstrap, navigation, response, _
+from mara_pipelines.logging.node_cost import format_duration
+
+import app.pipelines.benchmark
+import app.startup_benchmark
+from app.pipelines import config
+
+blueprint = flask.Blueprint('benchmarks', __name__, url_prefix='/benchmarks')
+
+acl_resource = acl.AclResource(name='Benchmarks')
+
+
+def navigation_entry():
+    return navigation.NavigationEntry(
+        label='Benchmarks', icon='tachometer', description='Benchmark runs of the pipelines & regressions',
+        uri_fn=lambda: flask.url_for('benchmarks.index_page'))
+
+
+def node_link(node_path: [str]):
+    return _.a(href=flask.url_for('mara_pipelines.node_page', path='/'.join(node_path)))[
+        ' / '.join(node_path) or 'Root pipeline']
+
+
+@blueprint.route('')
+@acl.require_permission(acl_resource)
+def index_page():
+    rows = [_.tr[_.td[_.a(href=flask.url_for('benchmarks.run_page', run_id=run.run_id))[str(run.run_id)]],
+                 _.td[node_link(run.node_path)],
+                 _.td[run.label or ''],
+                 _.td[_.tt[run.dataset]],
+                 _.td['serial' if run.serial else 'parallel'],
+                 _.td[run.start_time.strftime('%Y-%m-%d %H:%M')],
+                 _.td[format_duration((run.end_time - run.start_time).total_seconds()) if run.end_time else ''],
+                 _.td[{True: 'succeeded', False: 'failed'}.get(run.succeeded, 'running')]]
+            for run in app.pipelines.benchmark.runs()]
+
+    startup_rows = [_.tr[_.td[str(run.run_id)],
+                         _.td[run.label or ''],
+                         _.td[run.start_time.strftime('%Y-%m-%d %H:%M')],
+                         _.td[f'{run.import_time:.2f}s'],
+                         _.td[f'{run.wall_time:.2f}s']]
+                    for run in app.startup_benchmark.runs()]
+
+    return response.Response(
+        title='Benchmark runs',
+        html=[bootstrap.card(
+            header_left='Runs of `flask app.pipelines.benchmark`',
+            body=bootstrap.table(['Run', 'Pipeline', 'Label', 'Dataset', 'Mode', 'Start', 'Duration', 'Result'],
+                                 rows)),
+            bootstrap.card(
+                header_left='Startup time of the app (runs of `flask app.benchmark-startup`)',
+                body=bootstrap.table(['Run', 'Label', 'Start', 'Import time', 'Wall time'], startup_rows))])
+
+
+@blueprint.route('/<int:run_id>')
+@acl.require_permission(acl_resource)
+def run_page(run_id: int):
+    runs = app.pipelines.benchmark.runs(run_id=run_id)
+    if not runs:
+        flask.abort(404, f'Benchmark run {run_id} not found')
+    run = runs[0]
+
+    results = app.pipelines.benchmark.task_results(run_id)
+    rows = [_.tr(class_='table-danger' if result['is_regression'] else '')[
+                _.td[node_link(result['node_path'])],
+                _.td[format_duration(result['duration'])],
+                _.td[format_duration(result['baseline']) if result['baseline'] else ''],
+                _.td[f"{(result['duration'] / result['baseline'] - 1) * 100:+.0f}%" if result['baseline'] else ''],
+                _.td[f"{result['rows_written']:,}"],
+                _.td[f"{result['blocks_read']:,}"],
+                _.td[f"{result['blocks_hit']:,}"],
+                _.td[f"{result['temp_bytes']:,}"],
+                _.td[f"{result['wal_bytes']:,}" if result['wal_bytes'] is not None else ''],
+                _.td['' if result['succeeded'] else 'failed']]
+            for result in results]
+
+    number_of_regressions = len([result for result in results if result['is_regression']])
+    return response.Response(
+        title=f'Benchmark run {run_id}',
+        html=bootstrap.card(
+            header_left=[node_link(run.node_path), ' ', run.label or '',
+                         ' (', 'serial' if run.serial else 'parallel', ' run on ', _.tt[run.dataset], ')'],
+            header_right=f'{number_of_regressions} tasks more than {config.benchmark_regression_threshold()}% '
+                         f'slower than baseline' if number_of_regressions else 'No regressions',
+            body=[_.p[f'The baseline of a task is its median duration in the last '
+                      f'{config.benchmark_baseline_runs()} earlier runs on the same dataset. '
+                      'Database statistics are only exact for serial runs.'],
+                  bootstrap.table(['Task', 'Duration', 'Baseline', 'Change', 'Rows written', 'Blocks read',
+                                   'Blocks hit', 'Temp bytes', 'WAL bytes', ''], rows)]))
@@ -0,0 +1,39 @@
+"""Statistics of the database connection pools of the web server process"""
+
+import flask
+from mara_page import acl, bootstrap, navigation, response, _
+
+import app.config
+from app import connection_pool
+
+blueprint = flask.Blueprint('connection_pools', __name__, url_prefix='/connection-pools')
+
+acl_resource = acl.AclResource(name='Connection pools')
+
+
+def navigation_entry():
+    return navigation.NavigationEntry(
+        label='Connection pools', icon='plug', description='Usage of the pooled database connections',
+        uri_fn=lambda: flask.url_for('connection_pools.index_page'))
+
+
+@blueprint.route('')
+@acl.require_permission(acl_resource)
+def index_page():
+    return response.Response(
+        title='Database connection pools',
+        html=bootstrap.card(
+            header_left=f'Pooled connections per database alias '
+                        f'(between {app.config.connection_pool_min_size()} and '
+                        f'{app.config.connection_pool_max_size()} per process)',
+            body=[_.p['Counters are per web server process since its start.'],
+                  bootstrap.table(
+                      ['Alias', 'In use', 'Idle', 'Checkouts', 'Waits', 'Opened', 'Discarded'],
+                      [_.tr[_.td[db_alias],
+                            _.td[str(pool.in_use)],
+                            _.td[str(len(pool.idle_connections))],
+                            _.td[f'{pool.checkouts:,}'],
+                            _.td[f'{pool.waits:,}'],
+                            _.td[f'{pool.opened:,}'],
+                            _.td[f'{pool.discarded:,}']]
+                       for db_alias, pool in sorted(connection_pool.connection_pools().items())])]))
@@ -0,0 +1,145 @@
+"""Caching of data explorer results until the data_sets schema is replaced by the next pipeline run"""
+
+import collections
+import threading
+import time
+
+import flask
+import mara_data_explorer
+import mara_db.postgresql
+from mara_page import acl, bootstrap, navigation, response, _
+
+import app.config
+
+blueprint = flask.Blueprint('data_explorer_cache', __name__, url_prefix='/data-explorer-cache')
+
+acl_resource = acl.AclResource(name='Result cache')
+
+
+def navigation_entry():
+    return navigation.NavigationEntry(
+        label='Result cache', icon='bolt', description='Hit rate & size of the data explorer result cache',
+        uri_fn=lambda: flask.url_for('data_explorer_cache.index_page'))
+
+
+class ResultCache():
+    def __init__(self) -> None:
+        """
+        The responses of the data explorer requests that query data set tables (previews, row counts, rows,
+        distributions, ..), by url, request body and the data permissions of the user.
+        The least recently used responses are evicted when the cache exceeds `app.config.data_explorer_cache_size`.
+        """
+        self.entries: {tuple: (bytes, int, [(str, str)])} = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.schema_oid = None
+        self.last_check = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> (bytes, int, [(str, str)]):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def put(self, key: tuple, data: bytes, status: int, headers: [(str, str)]):
+        """Stores a response that was not found in the cache"""
+        with self.lock:
+            self.misses += 1
+            if key in self.entries or len(data) > app.config.data_explorer_cache_size():
+                return
+            self.entries[key] = (data, status, headers)
+            self.size += len(data)
+            while self.size > app.config.data_explorer_cache_size():
+                evicted_data = self.entries.popitem(last=False)[1][0]
+                self.size -= len(evicted_data)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def check_schema(self):
+        """Clears the cache when the data_sets schema was replaced since the last check"""
+        if time.time() - self.last_check < app.config.data_explorer_cache_check_interval():
+            return
+        self.last_check = time.time()
+
+        # `util.replace_schema` renames data_sets_next to data_sets, which gives data_sets a new oid
+        with mara_db.postgresql.postgres_cursor_context('dwh') as cursor:  # type: psycopg2.extensions.cursor
+            cursor.execute("SELECT oid FROM pg_namespace WHERE nspname = 'data_sets'")
+            result = cursor.fetchone()
+        schema_oid = result[0] if result else None
+
+        if schema_oid != self.schema_oid:
+            if self.schema_oid is not None:
+                self.invalidations += 1
+            self.clear()
+            self.schema_oid = schema_oid
+
+
+result_cache = ResultCache()
+
+
+def cache_key() -> tuple:
+    return (flask.request.method, flask.request.full_path, flask.request.get_data(),
+            tuple(acl.current_user_has_permission(resource)
+                  for resource in mara_data_explorer.MARA_ACL_RESOURCES().values()))
+
+
+@blueprint.before_app_request
+def serve_from_cache():
+    if flask.request.blueprint != 'mara_data_explorer':
+        return None
+
+    result_cache.check_schema()
+    flask.g.data_explorer_cache_key = cache_key()
+    entry = result_cache.get(flask.g.data_explorer_cache_key)
+    if entry:
+        flask.g.data_explorer_cache_hit = True
+        data, status, headers = entry
+        return flask.Response(data, status=status, headers=headers)
+
+
+@blueprint.after_app_request
+def store_in_cache(r: flask.Response):
+    # only fragments are cached, not whole pages (which contain user specific navigation) or downloads
+    if flask.request.blueprint == 'mara_data_explorer' and 'data_explorer_cache_key' in flask.g \
+            and not flask.g.get('data_explorer_cache_hit') and r.status_code == 200 \
+            and not isinstance(r, response.Response) and not r.is_streamed and not r.direct_passthrough:
+        result_cache.put(flask.g.data_explorer_cache_key, r.get_data(), r.status_code,
+                         [(name, value) for name, value in r.headers.items() if name != 'Set-Cookie'])
+    return r
+
+
+@blueprint.route('', methods=['GET', 'POST'])
+@acl.require_permission(acl_resource)
+def index_page():
+    if flask.request.method == 'POST':
+        result_cache.clear()
+        return flask.redirect(flask.url_for('data_explorer_cache.index_page'))
+
+    requests = result_cache.hits + result_cache.misses
+    return response.Response(
+        title='Data explorer result cache',
+        html=bootstrap.card(
+            header_left='Responses of data explorer queries, until the data_sets schema is replaced',
+            header_right=_.form(action=flask.url_for('data_explorer_cache.index_page'), method='post')[
+                _.button(type='submit', class_='btn btn-sm btn-outline-secondary')['Clear']],
+            body=[_.p['Counters are per web server process since its start.'],
+                  bootstrap.table(
+                      ['Hits', 'Misses', 'Hit rate', 'Entries', 'Size', 'Evictions', 'Invalidations'],
+                      [_.tr[_.td[f'{result_cache.hits:,}'],
+                            _.td[f'{result_cache.misses:,}'],
+                            _.td[f'{result_cache.hits / requests:.0%}' if requests else ''],
+                            _.td[f'{len(result_cache.entries):,}'],
+                            _.td[f'{result_cache.size / 1024 / 1024:.1f} of '
+                                 f'{app.config.data_explorer_cache_size() / 1024 / 1024:.0f} MB'],
+                            _.td[f'{result_cache.evictions:,}'],
+                            _.td[f'{result_cache.invalidations:,}']]])]))
@@ -0,0 +1,167 @@
+"""Caching of the graphviz diagrams of the start page, pre-warmed after each pipeline run"""
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import threading
+
+import flask
+import mara_db.dbs
+import mara_db.postgresql
+import mara_db.views
+import mara_pipelines.config
+import mara_pipelines.ui.views
+import mara_schema.config
+import mara_schema.ui.views
+from mara_app.monkey_patch import wrap
+from mara_page import acl
+from mara_pipelines import execution, pipelines
+
+import app.config
+
+blueprint = flask.Blueprint('graph_cache', __name__)
+
+
+def start_page_graph_urls() -> [str]:
+    """The urls of the diagrams that are embedded in the start page"""
+    return [flask.url_for('mara_schema.overview_graph'),
+            flask.url_for('mara_pipelines.dependency_graph', path='/'),
+            flask.url_for('mara_db.draw_schema', db_alias=mara_pipelines.config.default_db_alias(),
+                          schemas='ec_dim') + '?hide-columns=True']
+
+
+def _fingerprint(structure) -> str:
+    return hashlib.sha1(json.dumps(structure, default=str).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def pipeline_version() -> str:
+    """A fingerprint of the nodes and dependencies of all pipelines (they don't change while the app is running)"""
+
+    def node_structure(node: pipelines.Node):
+        return [node.id, node.description, sorted(upstream.id for upstream in node.upstreams),
+                [node_structure(child) for child in node.nodes.values()]
+                if isinstance(node, pipelines.Pipeline) else []]
+
+    return _fingerprint(node_structure(mara_pipelines.config.root_pipeline()))
+
+
+@functools.lru_cache(maxsize=None)
+def data_set_version() -> str:
+    """A fingerprint of the entities and entity links of all data sets"""
+    entities = set()
+    for data_set in mara_schema.config.data_sets():
+        entities.update(data_set.entity.connected_entities())
+
+    return _fingerprint(sorted(
+        [entity.name, entity.description, entity.data_set.name if entity.data_set else None,
+         sorted([entity_link.prefix, entity_link.target_entity.name] for entity_link in entity.entity_links)]
+        for entity in entities))
+
+
+def catalog_version(db_alias: str, schemas: str) -> str:
+    """
+    A fingerprint of the tables, columns and foreign keys in some schemas of a PostgreSQL database.
+    Changes when a pipeline run replaces a schema, or creates tables or constraints in it.
+    """
+    if not isinstance(mara_db.dbs.db(db_alias), mara_db.dbs.PostgreSQLDB):
+        return None
+
+    with mara_db.postgresql.postgres_cursor_context(db_alias) as cursor:  # type: psycopg2.extensions.cursor
+        cursor.execute('''
+WITH schema AS (SELECT oid FROM pg_namespace WHERE nspname = ANY(%(schemas)s))
+SELECT
+  coalesce((SELECT string_agg(oid || ':' || relnatts, ',' ORDER BY oid)
+            FROM pg_class
+            WHERE relnamespace IN (SELECT oid FROM schema)), '')
+  || '|' ||
+  coalesce((SELECT string_agg(oid :: TEXT, ',' ORDER BY oid)
+            FROM pg_constraint
+            WHERE contype = 'f' AND connamespace IN (SELECT oid FROM schema)), '')''',
+                       {'schemas': schemas.split('/')})
+        return _fingerprint(cursor.fetchone()[0])
+
+
+cached_graphs = {
+    'mara_schema.overview_graph': (mara_schema.ui.views.acl_resource_schema, lambda: data_set_version()),
+    'mara_pipelines.dependency_graph': (mara_pipelines.ui.views.acl_resource, lambda path: pipeline_version()),
+    'mara_db.draw_schema': (mara_db.views.acl_resource, catalog_version)}
+"""For each cached endpoint, the acl resource that protects it and a function that computes the version of
+   what is drawn (from the view arguments)"""
+
+
+def cache_file(endpoint: str, view_args: dict) -> pathlib.Path:
+    """The file in which the diagram of the current request is stored, or None when it can't be cached"""
+    version = cached_graphs[endpoint][1](**view_args)
+    if not version:
+        return None
+    return app.config.graph_cache_dir() / f'{_fingerprint([endpoint, flask.request.full_path, version])}.svg'
+
+
+def store(file: pathlib.Path, data: bytes):
+    """Writes to a temporary file first, so that other web server processes never read half written diagrams"""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = file.parent / f'{file.name}.{os.getpid()}.{threading.get_ident()}.tmp'
+    tmp_file.write_bytes(data)
+    tmp_file.replace(file)
+
+
+@blueprint.before_app_request
+def serve_from_cache():
+    if flask.request.endpoint not in cached_graphs:
+        return None
+
+    # the views check permissions themselves, which is skipped on cache hits
+    acl_resource = cached_graphs[flask.request.endpoint][0]
+    if not acl.current_user_has_permission(acl_resource):
+        return None
+
+    flask.g.graph_cache_file = cache_file(flask.request.endpoint, flask.request.view_args)
+    if flask.g.graph_cache_file and flask.g.graph_cache_file.exists():
+        flask.g.graph_cache_hit = True
+        return flask.Response(flask.g.graph_cache_file.read_bytes())
+
+
+@blueprint.after_app_request
+def store_in_cache(r: flask.Response):
+    # error messages (e.g. when graphviz is not installed) are not cached
+    if flask.g.get('graph_cache_file') and not flask.g.get('graph_cache_hit') and r.status_code == 200 \
+            and not r.is_streamed and b'<svg' in r.get_data():
+        store(flask.g.graph_cache_file, r.get_data())
+    return r
+
+
+def prewarm():
+    """Renders the diagrams of the start page into an emptied cache"""
+    from app.app import app as flask_app
+
+    with flask_app.test_request_context():
+        urls = start_page_graph_urls()
+
+    for file in app.config.graph_cache_dir().glob('*.svg'):
+        file.unlink()
+
+    for url in urls:
+        with flask_app.test_request_context(url):
+            view_function = flask_app.view_functions[flask.request.endpoint]
+            # bypasses the acl check of the view, as there is no user when the pipeline runs
+            r = flask_app.make_response(
+                getattr(view_function, '__wrapped__', view_function)(**flask.request.view_args))
+            file = cache_file(flask.request.endpoint, flask.request.view_args)
+            if file and b'<svg' in r.get_data():
+                store(file, r.get_data())
+
+
+@wrap(execution.run_pipeline)
+def run_pipeline(original_function, pipeline: pipelines.Pipeline, nodes: {pipelines.Node} = None,
+                 with_upstreams: bool = False, interactively_started: bool = False):
+    """Pre-warms the diagram cache after the run, as the run might have changed schemas that are drawn"""
+    yield from original_function(pipeline, nodes, with_upstreams, interactively_started)
+
+    try:
+        prewarm()
+    except Exception as e:
+        sys.stderr.write(f'Could not pre-warm the graph cache: {e}\n')
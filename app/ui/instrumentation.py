@@ -0,0 +1,229 @@
+"""Latency and database time of web requests by route, and sampled stacks of slow requests"""
+
+import collections
+import contextlib
+import datetime
+import sys
+import threading
+import time
+
+import flask
+from mara_app.monkey_patch import wrap
+from mara_page import acl, bootstrap, navigation, response, _
+from werkzeug.wsgi import ClosingIterator
+
+import app.config
+import app.connection_pool
+
+blueprint = flask.Blueprint('instrumentation', __name__, url_prefix='/instrumentation')
+
+acl_resource = acl.AclResource(name='Instrumentation')
+
+
+def navigation_entry():
+    return navigation.NavigationEntry(
+        label='Instrumentation', icon='stethoscope', description='Latency & database time of requests by route',
+        uri_fn=lambda: flask.url_for('instrumentation.index_page'))
+
+
+class RouteStatistics():
+    def __init__(self) -> None:
+        """Durations of the requests of a route (the last ones for percentiles) and their time spent in databases"""
+        self.durations = collections.deque(maxlen=app.config.instrumentation_sample_size())
+        self.count = 0
+        self.total_duration = 0.0
+        self.db_time: {str: float} = collections.defaultdict(float)
+
+    def percentile(self, p: float) -> float:
+        durations = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(round(p * (len(durations) - 1))))] if durations else None
+
+
+class RequestRecording():
+    def __init__(self, environ: dict) -> None:
+        """What is recorded while a request is processed"""
+        self.environ = environ
+        self.start_time = time.time()
+        self.db_time: {str: float} = collections.defaultdict(float)
+        self.stacks: {str: int} = collections.Counter()
+
+
+route_statistics: {str: RouteStatistics} = {}
+active_recordings: {int: RequestRecording} = {}
+"""The recordings of the requests that are currently processed, by thread id"""
+
+lock = threading.Lock()
+
+
+class InstrumentationMiddleware():
+    def __init__(self, wsgi_app) -> None:
+        """Wraps the wsgi app of the flask app and records all requests when `app.config.instrumentation_enabled`"""
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if not app.config.instrumentation_enabled():
+            return self.wsgi_app(environ, start_response)
+
+        recording = RequestRecording(environ)
+        thread_id = threading.get_ident()
+        with lock:
+            active_recordings[thread_id] = recording
+        if app.config.request_sampling_enabled():
+            start_sampler()
+
+        def finish():
+            with lock:
+                active_recordings.pop(thread_id, None)
+            finish_recording(recording)
+
+        try:
+            # the response body is only completely sent when the returned iterable is closed
+            return ClosingIterator(self.wsgi_app(environ, start_response), [finish])
+        except Exception:
+            finish()
+            raise
+
+
+def finish_recording(recording: RequestRecording):
+    duration = time.time() - recording.start_time
+    endpoint = recording.environ.get('instrumentation.endpoint') or 'unmatched'
+    with lock:
+        statistics = route_statistics.setdefault(endpoint, RouteStatistics())
+        statistics.durations.append(duration)
+        statistics.count += 1
+        statistics.total_duration += duration
+        for db_alias, db_time in recording.db_time.items():
+            statistics.db_time[db_alias] += db_time
+
+    if recording.stacks and duration >= app.config.slow_request_threshold():
+        dump_profile(recording, endpoint, duration)
+
+
+@blueprint.app_url_value_preprocessor
+def record_endpoint(endpoint: str, values: dict):
+    # runs for all requests that match a route, before any `before_request` function can abort them
+    flask.request.environ['instrumentation.endpoint'] = endpoint
+
+
+@wrap(app.connection_pool.pooled_cursor_context)
+@contextlib.contextmanager
+def pooled_cursor_context(original_function, db_alias: str):
+    """Adds the time spent in a cursor context (including waiting for a connection) to the current request"""
+    start_time = time.time()
+    try:
+        with original_function(db_alias) as cursor:
+            yield cursor
+    finally:
+        recording = active_recordings.get(threading.get_ident())
+        if recording:
+            recording.db_time[db_alias] += time.time() - start_time
+
+
+_sampler: threading.Thread = None
+
+
+def start_sampler():
+    """Starts a thread that periodically records the stacks of all threads that process requests"""
+    global _sampler
+    with lock:
+        if _sampler and _sampler.is_alive():
+            return
+        _sampler = threading.Thread(target=sample_stacks, name='request-sampler', daemon=True)
+        _sampler.start()
+
+
+def sample_stacks():
+    while app.config.request_sampling_enabled():
+        time.sleep(app.config.request_sampling_interval())
+        frames = sys._current_frames()
+        with lock:
+            recordings = list(active_recordings.items())
+        for thread_id, recording in recordings:
+            if thread_id in frames:
+                recording.stacks[folded_stack(frames[thread_id])] += 1
+
+
+def folded_stack(frame) -> str:
+    """The functions of a stack from the outermost to the innermost, separated by `;`"""
+    functions = []
+    while frame:
+        functions.append(f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(functions))
+
+
+def dump_profile(recording: RequestRecording, endpoint: str, duration: float):
+    """
+    Writes the sampled stacks of a slow request in the folded format of flamegraph.pl
+    (can also be opened in https://www.speedscope.app). Only the newest profiles are kept.
+    """
+    profile_dir = app.config.request_profile_dir()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    file_name = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{endpoint}-{int(duration * 1000)}ms.folded"
+    (profile_dir / file_name).write_text(
+        ''.join(f'{stack} {count}\n' for stack, count in recording.stacks.items()))
+
+    for old_profile in sorted(profile_dir.glob('*.folded'), reverse=True)[app.config.number_of_request_profiles():]:
+        old_profile.unlink()
+
+
+@blueprint.route('')
+@acl.require_permission(acl_resource)
+def index_page():
+    with lock:
+        statistics = sorted(route_statistics.items(), key=lambda item: item[1].total_duration, reverse=True)
+        db_aliases = sorted({db_alias for endpoint, route in statistics for db_alias in route.db_time})
+        rows = [_.tr[_.td[_.tt[endpoint]],
+                     _.td[f'{route.count:,}'],
+                     [_.td[f'{route.percentile(p) * 1000:,.0f} ms'] for p in [0.5, 0.95, 0.99]],
+                     [_.td[f'{route.db_time[db_alias] / route.count * 1000:,.1f} ms' if db_alias in route.db_time
+                           else ''] for db_alias in db_aliases]]
+                for endpoint, route in statistics]
+
+    profiles = sorted(app.config.request_profile_dir().glob('*.folded'), reverse=True) \
+        if app.config.request_profile_dir().exists() else []
+
+    return response.Response(
+        title='Instrumentation',
+        html=[bootstrap.card(
+            header_left='Latency by route' + ('' if app.config.instrumentation_enabled() else ' (disabled)'),
+            header_right=_.a(href=flask.url_for('instrumentation.metrics'))['Prometheus metrics'],
+            body=[_.p[f'Percentiles of the last {app.config.instrumentation_sample_size():,} requests of each route, '
+                      'and the average time per request spent in database cursors by database alias. ',
+                      'Counters are per web server process since its start.'],
+                  bootstrap.table(['Route', 'Requests', 'p50', 'p95', 'p99']
+                                  + [f'DB time {db_alias}' for db_alias in db_aliases], rows)]),
+            bootstrap.card(
+                header_left=f'Sampled stacks of requests slower than {app.config.slow_request_threshold()}s'
+                            + ('' if app.config.request_sampling_enabled() else ' (sampling disabled)'),
+                body=[_.p['In the folded format of flamegraph.pl, can also be opened in ',
+                          _.a(href='https://www.speedscope.app')['speedscope'], '.'],
+                      _.ul[[_.li[_.a(href=flask.url_for('instrumentation.profile', file_name=profile.name))[
+                          profile.name]] for profile in profiles]] if profiles else _.i['No profiles']])])
+
+
+@blueprint.route('/profiles/<string:file_name>')
+@acl.require_permission(acl_resource)
+def profile(file_name: str):
+    return flask.send_from_directory(str(app.config.request_profile_dir().absolute()), file_name,
+                                     mimetype='text/plain', as_attachment=True)
+
+
+@blueprint.route('/metrics')
+def metrics():
+    """Request statistics in the Prometheus text format (not acl protected, for scrapers)"""
+    lines = ['# TYPE mara_request_duration_seconds summary']
+    with lock:
+        for endpoint, route in sorted(route_statistics.items()):
+            for p in [0.5, 0.95, 0.99]:
+                lines.append(f'mara_request_duration_seconds{{endpoint="{endpoint}",quantile="{p}"}} '
+                             f'{route.percentile(p)}')
+            lines.append(f'mara_request_duration_seconds_sum{{endpoint="{endpoint}"}} {route.total_duration}')
+            lines.append(f'mara_request_duration_seconds_count{{endpoint="{endpoint}"}} {route.count}')
+
+        lines.append('# TYPE mara_request_db_seconds_total counter')
+        for endpoint, route in sorted(route_statistics.items()):
+            for db_alias, db_time in sorted(route.db_time.items()):
+                lines.append(f'mara_request_db_seconds_total{{endpoint="{endpoint}",db_alias="{db_alias}"}} {db_time}')
+
+    return flask.Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,93 @@
+"""Caching of acl permissions, so that not every permission check of a request reads the mara database"""
+
+import threading
+import time
+
+import flask
+import mara_acl.config
+import mara_acl.permissions
+from mara_acl import keys
+from mara_app.monkey_patch import wrap
+from mara_page import acl
+
+import app.config
+
+
+class PermissionCache():
+    def __init__(self) -> None:
+        """
+        Whether users are allowed to access resources, by user key (role & email) and resource key.
+        Entries expire after `app.config.acl_permission_cache_ttl` seconds.
+        """
+        self.permissions: {(str, str): (bool, float)} = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_key: str, resource_keys: [str]) -> {str: bool}:
+        """The cached permissions that have not expired yet, by resource key"""
+        now = time.time()
+        permissions = {}
+        with self.lock:
+            for resource_key in resource_keys:
+                allowed, expiry_time = self.permissions.get((user_key, resource_key), (None, 0))
+                if expiry_time > now:
+                    permissions[resource_key] = allowed
+        return permissions
+
+    def put(self, user_key: str, permissions: {str: bool}):
+        expiry_time = time.time() + app.config.acl_permission_cache_ttl()
+        with self.lock:
+            for resource_key, allowed in permissions.items():
+                self.permissions[(user_key, resource_key)] = (allowed, expiry_time)
+
+    def clear(self):
+        with self.lock:
+            self.permissions.clear()
+
+
+permission_cache = PermissionCache()
+
+
+def all_resources(resources: [acl.AclResource]) -> [acl.AclResource]:
+    """The resources and all their descendants"""
+    return [descendant for resource in resources
+            for descendant in [resource] + all_resources(resource.children)]
+
+
+@wrap(mara_acl.permissions.current_user_has_permissions)
+def current_user_has_permissions(original_function, resources: [acl.AclResource]) -> [[acl.AclResource, bool]]:
+    """
+    Reads permissions from the cache. On a miss, the permissions of the current user for all resources
+    of the acl are queried at once, so that the remaining checks of the request (and of the following
+    requests) don't need the database.
+    """
+    user_key = keys.user_key(getattr(flask.g, 'current_user_role'), getattr(flask.g, 'current_user_email'))
+    permissions = permission_cache.get(user_key, [keys.resource_key(resource) for resource in resources])
+
+    missing_resources = [resource for resource in resources if keys.resource_key(resource) not in permissions]
+    if missing_resources:
+        resources_to_query = {keys.resource_key(resource): resource
+                              for resource in all_resources(mara_acl.config.resources()) + missing_resources}
+        queried_permissions = {keys.resource_key(resource): allowed for resource, allowed
+                               in original_function(list(resources_to_query.values()))}
+        permission_cache.put(user_key, queried_permissions)
+        permissions.update(queried_permissions)
+
+    return [[resource, permissions[keys.resource_key(resource)]] for resource in resources]
+
+
+@wrap(mara_acl.permissions.save_permissions)
+def save_permissions(original_function, permissions: {str: [str, str]}):
+    """Clears the permission cache (of this process) after saving permissions in the acl page"""
+    try:
+        return original_function(permissions)
+    finally:
+        permission_cache.clear()
+
+
+@wrap(mara_acl.permissions.initialize_permissions)
+def initialize_permissions(original_function):
+    """Clears the permission cache (of this process) after resetting permissions to the configured defaults"""
+    try:
+        return original_function()
+    finally:
+        permission_cache.clear()
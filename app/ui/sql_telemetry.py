@@ -0,0 +1,65 @@
+"""The most expensive sql statements of pipeline nodes, on their node pages"""
+
+import flask
+import mara_pipelines.ui.node_page
+import mara_pipelines.ui.views
+from mara_app.monkey_patch import wrap
+from mara_page import acl, bootstrap, html, _
+from mara_pipelines import pipelines
+from mara_pipelines.logging.node_cost import format_duration
+
+import app.pipelines.sql_telemetry
+from app.pipelines import config
+
+blueprint = flask.Blueprint('sql_telemetry', __name__, url_prefix='/sql-telemetry')
+
+
+def format_bytes(number_of_bytes: int) -> str:
+    for unit in ['B', 'kB', 'MB', 'GB']:
+        if abs(number_of_bytes) < 1024:
+            return f'{number_of_bytes:,.0f} {unit}'
+        number_of_bytes /= 1024
+    return f'{number_of_bytes:,.1f} TB'
+
+
+@blueprint.route('/<path:path>')
+@blueprint.route('', defaults={'path': ''})
+@acl.require_permission(mara_pipelines.ui.views.acl_resource, do_abort=False)
+def top_statements(path: str):
+    node_path = [node_id for node_id in path.split('/') if node_id]
+    statements = app.pipelines.sql_telemetry.top_statements(node_path, config.sql_telemetry_top_statements())
+    if not statements:
+        return str(_.i['No statements recorded'])
+
+    def number(value: int) -> str:
+        return f'{value:,}' if value is not None else ''
+
+    return str(_.div[
+        _.p[f'Run {statements[0]["run_id"]}, statements slower than {config.sql_telemetry_min_duration()}s. '
+            'Blocks are 8 kB, the size change is that of all tables during the command.'],
+        bootstrap.table(
+            ['Task', 'Command', 'Statement', 'Duration', 'Rows', 'Blocks hit', 'Blocks read', 'Temp blocks written',
+             'Size change'],
+            [_.tr[_.td[_.a(href=flask.url_for('mara_pipelines.node_page', path='/'.join(statement['node_path'])))[
+                ' / '.join(statement['node_path'][len(node_path):]) or statement['node_path'][-1]]],
+                  _.td[_.tt[statement['command']]],
+                  _.td[_.tt[(statement['query_text'] or '')[:300]]],
+                  _.td[format_duration(statement['duration'])],
+                  _.td[number(statement['rows'])],
+                  _.td[number(statement['shared_blocks_hit'])],
+                  _.td[number(statement['shared_blocks_read'])],
+                  _.td[number(statement['temp_blocks_written'])],
+                  _.td[format_bytes(statement['command_size_delta']) if statement['command_size_delta'] else '']]
+             for statement in statements])])
+
+
+@wrap(mara_pipelines.ui.node_page.node_content)
+def node_content(original_function, node: pipelines.Node):
+    """Adds the most expensive statements of the last run to the pages of nodes of pipelines with telemetry"""
+    content = original_function(node)
+    if not config.sql_telemetry() or not node.parent or node.path()[0] not in config.sql_telemetry_pipelines():
+        return content
+    return [content,
+            bootstrap.card(header_left='Most expensive sql statements',
+                           body=html.asynchronous_content(
+                               url=flask.url_for('sql_telemetry.top_statements', path='/'.join(node.path()))))]
@@ -94,6 +94,8 @@ def start_page():
                             _.span(class_='fa fa-wrench')[''], ' Pipelines']],
                         ': The data integration pipelines that create the DWH'
                     ],
+                    header_right=_.a(href=flask.url_for('benchmarks.index_page'))[
+                        _.span(class_='fa fa-tachometer')[''], ' Benchmarks'],
                     body=html.asynchronous_content(
                         flask.url_for('mara_pipelines.dependency_graph', path='/'))),
                 bootstrap.card(